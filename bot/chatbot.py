@@ -62,16 +62,21 @@ class ChatBot:
         
         # Preprocess input
         if self.use_advanced_workflow:
-            query_obj = self.orchestrator.preprocessor.preprocess(user_message)
+            query_obj = self.orchestrator.preprocessor.preprocess(
+                user_message,
+                with_embedding=use_embedding_search
+            )
             logger.debug(f"Query intent: {query_obj['intent']}")
             
             # Add user message with embedding
             self.orchestrator.add_message(
                 'user', 
                 user_message,
-                embedding=query_obj['embedding'],
-                intent=query_obj['intent'],
-                keywords=query_obj['keywords']
+                {
+                    'embedding': query_obj['embedding'],
+                    'intent': query_obj['intent'],
+                    'keywords': query_obj['keywords']
+                }
             )
         else:
             # Simple mode
@@ -148,12 +153,10 @@ class ChatBot:
         Returns:
             Dictionary with conversation statistics
         """
-        memory_state = self.orchestrator.to_dict()
-        
         return {
             'bot_name': self.bot_name,
             'conversation_active': self.conversation_active,
-            'short_term_messages': len(memory_state['short_term']['messages']),
-            'mid_term_chunks': len(memory_state['mid_term']['chunks']),
-            'message_count': memory_state['message_count'],
+            'short_term_messages': self.orchestrator.short_term_count,
+            'mid_term_chunks': self.orchestrator.mid_term_chunk_count,
+            'message_count': self.orchestrator.message_count,
         }
@@ -1,9 +1,31 @@
 from typing import Dict, Any, Optional
 import random
+import string
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Mock reply templates, formatted only once a template has been picked
+_MOCK_TEMPLATES = (
+    "I understand you said: '{0}'. Let me think about that.",
+    "That's interesting! Regarding '{0}', here's what I think...",
+    "Thanks for sharing that. About '{0}', I can help with that.",
+    "I hear you. Let me process '{0}' in context of our conversation.",
+)
+_MOCK_CONTEXT_NOTE = "\n\n(Context: I remember we discussed some things earlier.)"
+# Indexed by bool(context): plain templates, then templates with the context note
+_MOCK_VARIANTS = (
+    _MOCK_TEMPLATES,
+    tuple(template + _MOCK_CONTEXT_NOTE for template in _MOCK_TEMPLATES),
+)
+
+# Rule-based keyword sets, matched against message tokens
+_GREETING_WORDS = frozenset({'hello', 'hi', 'hey'})
+_FAREWELL_WORDS = frozenset({'bye', 'goodbye'})
+_FAREWELL_PHRASES = ('see you',)
+_HELP_WORDS = frozenset({'help'})
+_PUNCT_TO_SPACE = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
 class ResponseGenerator:
     """
     Generates responses for the chatbot.
@@ -26,6 +48,8 @@ class ResponseGenerator:
         self.mode = mode
         self.llm_config = llm_config or {}
         self.llm_client = llm_client
+        # Own RNG so concurrent generators don't share the global random state
+        self._rng = random.Random()
     
     def generate(self, user_message: str, context: str = "") -> str:
         """
@@ -58,19 +82,9 @@ class ResponseGenerator:
         Returns:
             Mock response string
         """
-        responses = [
-            f"I understand you said: '{user_message}'. Let me think about that.",
-            f"That's interesting! Regarding '{user_message}', here's what I think...",
-            f"Thanks for sharing that. About '{user_message}', I can help with that.",
-            f"I hear you. Let me process '{user_message}' in context of our conversation.",
-        ]
-        
-        response = random.choice(responses)
-        
-        if context:
-            response += f"\n\n(Context: I remember we discussed some things earlier.)"
-        
-        return response
+        templates = _MOCK_VARIANTS[bool(context)]
+        template = templates[self._rng.randrange(len(templates))]
+        return template.format(user_message)
     
     def _llm_response(self, user_message: str, context: str) -> str:
         """
@@ -128,16 +142,23 @@ Please provide a helpful response based on the context above."""
         Returns:
             Rule-based response
         """
-        message_lower = user_message.lower()
+        # Greetings take priority, so a greeting first word settles it without
+        # lowercasing the whole message
+        head = user_message.lstrip().partition(' ')[0].lower().translate(_PUNCT_TO_SPACE)
+        if _GREETING_WORDS.intersection(head.split()):
+            return "Hello! How can I help you today?"
+        
+        normalized = user_message.lower().translate(_PUNCT_TO_SPACE)
+        tokens = set(normalized.split())
         
         # Simple keyword matching
-        if any(word in message_lower for word in ['hello', 'hi', 'hey']):
+        if tokens & _GREETING_WORDS:
             return "Hello! How can I help you today?"
         
-        elif any(word in message_lower for word in ['bye', 'goodbye', 'see you']):
+        elif tokens & _FAREWELL_WORDS or any(p in normalized for p in _FAREWELL_PHRASES):
             return "Goodbye! Have a great day!"
         
-        elif 'help' in message_lower:
+        elif tokens & _HELP_WORDS:
             return "I'm here to help! What do you need assistance with?"
         
         elif '?' in user_message:
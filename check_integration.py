@@ -12,6 +12,69 @@ Validates:
 import os
 import json
 import sys
+from functools import lru_cache
+
+try:
+    # C parser; its JSONDecodeError subclasses json.JSONDecodeError
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+@lru_cache(maxsize=None)
+def _read_text(path, mtime):
+    """Read a file once per (path, mtime) pair."""
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def read_text(path):
+    """Read a file, reusing the cached contents while it is unchanged."""
+    return _read_text(path, os.path.getmtime(path))
+
+
+@lru_cache(maxsize=None)
+def _read_json(path, mtime):
+    with open(path, 'rb') as f:
+        return _json_loads(f.read())
+
+
+def load_json(path):
+    """Parse a JSON file, reusing the cached result while it is unchanged."""
+    return _read_json(path, os.path.getmtime(path))
+
+
+def _scan_dir(directory):
+    """Map names in a directory to their DirEntry with a single scandir call."""
+    try:
+        with os.scandir(directory or '.') as it:
+            return {entry.name: entry for entry in it}
+    except OSError:
+        return {}
+
+
+def find_entries(paths):
+    """Return {path: DirEntry} for the paths that exist, scanning each directory once."""
+    listings = {}
+    found = {}
+    
+    for path in paths:
+        directory, name = os.path.split(path)
+        if directory not in listings:
+            listings[directory] = _scan_dir(directory)
+        entry = listings[directory].get(name)
+        if entry is not None:
+            found[path] = entry
+    
+    return found
+
+
+# Sections each document must mention
+REQUIRED_SECTIONS = {
+    'README.md': ['Quick Start', 'Configuration', 'Features'],
+    'default': ['Setup', 'Install'],
+}
 
 
 def check_data_files():
@@ -19,17 +82,22 @@ def check_data_files():
     print("\n1️⃣ Checking data files...")
     
     files = ['data/stm.json', 'data/mtm.json', 'data/ltm.json']
+    present = find_entries(files)
     all_ok = True
     
     for file in files:
-        if not os.path.exists(file):
+        if file not in present:
             print(f"   ❌ {file} - Missing")
             all_ok = False
             continue
         
+        if present[file].stat().st_size == 0:
+            print(f"   ❌ {file} - Empty file")
+            all_ok = False
+            continue
+        
         try:
-            with open(file, 'r') as f:
-                data = json.load(f)
+            data = load_json(file)
             print(f"   ✅ {file} - {len(data)} items")
         except json.JSONDecodeError as e:
             print(f"   ❌ {file} - Invalid JSON: {e}")
@@ -46,17 +114,22 @@ def check_schemas():
     print("\n2️⃣ Checking schema files...")
     
     files = ['utils/schema/stm.json', 'utils/schema/mtm.json', 'utils/schema/ltm.json']
+    present = find_entries(files)
     all_ok = True
     
     for file in files:
-        if not os.path.exists(file):
+        if file not in present:
             print(f"   ❌ {file} - Missing")
             all_ok = False
             continue
         
+        if present[file].stat().st_size == 0:
+            print(f"   ❌ {file} - Empty file")
+            all_ok = False
+            continue
+        
         try:
-            with open(file, 'r') as f:
-                schema = json.load(f)
+            schema = load_json(file)
             print(f"   ✅ {file} - Valid")
         except json.JSONDecodeError as e:
             print(f"   ❌ {file} - Invalid JSON: {e}")
@@ -77,10 +150,11 @@ def check_scripts():
         'main.py': 'Main application'
     }
     
+    present = find_entries(scripts)
     all_ok = True
     
     for script, desc in scripts.items():
-        if os.path.exists(script):
+        if script in present:
             print(f"   ✅ {script} - {desc}")
         else:
             print(f"   ❌ {script} - Missing ({desc})")
@@ -99,20 +173,17 @@ def check_file_references():
         ('utils/schema_validator.py', ['data/stm.json', 'data/mtm.json', 'data/ltm.json']),
     ]
     
+    present = find_entries(script for script, _ in checks)
     all_ok = True
     
     for script, expected_files in checks:
-        if not os.path.exists(script):
+        if script not in present:
             print(f"   ⚠️  {script} - File doesn't exist")
             continue
         
-        with open(script, 'r') as f:
-            content = f.read()
+        content = read_text(script)
         
-        missing = []
-        for file in expected_files:
-            if file not in content:
-                missing.append(file)
+        missing = [f for f in expected_files if f not in content]
         
         if missing:
             print(f"   ⚠️  {script} - Missing refs: {missing}")
@@ -128,19 +199,15 @@ def check_documentation():
     print("\n5️⃣ Checking documentation...")
     
     docs = ['README.md', 'SETUP.md']
+    present = find_entries(docs)
     all_ok = True
     
     for doc in docs:
-        if os.path.exists(doc):
-            with open(doc, 'r') as f:
-                content = f.read()
+        if doc in present:
+            content = read_text(doc)
             
             # Check for key sections
-            if doc == 'README.md':
-                required = ['Quick Start', 'Configuration', 'Features']
-            else:
-                required = ['Setup', 'Install']
-            
+            required = REQUIRED_SECTIONS.get(doc, REQUIRED_SECTIONS['default'])
             missing = [r for r in required if r not in content]
             
             if missing:
@@ -164,10 +231,10 @@ def check_config():
         'config.py',
     ]
     
-    all_ok = True
+    present = find_entries(configs)
     
     for config in configs:
-        if os.path.exists(config):
+        if config in present:
             print(f"   ✅ {config}")
         else:
             print(f"   ⚠️  {config} - Missing (optional)")
@@ -6,18 +6,75 @@ Compare multiple configurations side-by-side.
 Useful for A/B testing compression parameters.
 """
 
+import io
+import os
 import json
+import hashlib
 import sys
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from evaluate_memory import MemoryEvaluator
 
+try:
+    import orjson
+    
+    def _dump_report(report: Dict[str, Any]) -> bytes:
+        return orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def _dump_report(report: Dict[str, Any]) -> bytes:
+        return json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+# Evaluation outcomes keyed by canonical config hash, shared across comparisons
+_EVAL_CACHE: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+
+def _config_key(config: Dict[str, Any]) -> str:
+    """Stable hash of a config, independent of key order."""
+    canonical = json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+def _intern_keys(value: Any) -> Any:
+    """Recursively intern dict keys so every result shares one key object per name."""
+    if isinstance(value, dict):
+        return {(sys.intern(k) if isinstance(k, str) else k): _intern_keys(v)
+                for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern_keys(v) for v in value]
+    return value
+
+
+def _evaluate_one(config: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Run a full evaluation for one config (executed in a worker process).
+    
+    Returns:
+        (captured stdout, evaluation result)
+    """
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        # The parent writes reports, so concurrent workers never share a file name
+        result = MemoryEvaluator(config).run_full_evaluation(save=False)
+    return buf.getvalue(), result
+
 
 class ConfigComparator:
     """Compare multiple configurations."""
     
-    def __init__(self, configs: List[Dict[str, Any]]):
+    def __init__(self, configs: List[Dict[str, Any]], max_workers: Optional[int] = None):
+        """
+        Args:
+            configs: Configurations to evaluate
+            max_workers: Worker processes (default: one per config, capped at CPU
+                count). Each worker loads its own embedding model; 1 evaluates
+                in this process with a single shared model.
+        """
         self.configs = configs
+        self.max_workers = max_workers or max(1, min(len(configs), os.cpu_count() or 1))
     
     def compare(self) -> Dict[str, Any]:
         """Run comparison across all configs."""
@@ -27,32 +84,52 @@ class ConfigComparator:
         
         results = []
         
-        for idx, config in enumerate(self.configs, 1):
-            print(f"\n{'='*80}")
-            print(f"Config {idx}: {config}")
-            print('='*80)
-            
-            evaluator = MemoryEvaluator(config)
-            result = evaluator.run_full_evaluation()
+        # Only evaluate configs not seen before (in this or an earlier comparison)
+        keys = [_config_key(config) for config in self.configs]
+        pending = {}
+        for key, config in zip(keys, self.configs):
+            if key not in _EVAL_CACHE:
+                pending.setdefault(key, config)
+        
+        # Configs are independent, so evaluate them concurrently; each one's
+        # captured output is shown (in order) as soon as it is available
+        run_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        with contextlib.ExitStack() as stack:
+            if len(pending) > 1 and self.max_workers > 1:
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending))))
+                fresh = executor.map(_evaluate_one, pending.values())
+            else:
+                fresh = map(_evaluate_one, pending.values())
             
-            results.append({
-                'config_id': idx,
-                'config': config,
-                'summary': result['summary'],
-                'compression': result['compression']
-            })
+            for idx, (config, key) in enumerate(zip(self.configs, keys), 1):
+                evaluated = key not in _EVAL_CACHE
+                if evaluated:
+                    # Pending keys are in first-occurrence order, like this loop
+                    output, result = next(fresh)
+                    # Unpickled results carry fresh key strings; share them instead
+                    _EVAL_CACHE[key] = (output, _intern_keys(result))
+                output, result = _EVAL_CACHE[key]
+                
+                banner = f"\n{'='*80}\nConfig {idx}: {config}\n{'='*80}\n"
+                sys.stdout.write(banner + output)
+                if evaluated:
+                    # One report per config, named so none overwrites another
+                    MemoryEvaluator.save_report(result, f"evaluation_report_{run_stamp}_config{idx}.json")
+                sys.stdout.flush()
+                
+                results.append({
+                    'config_id': idx,
+                    'config': config,
+                    'summary': result['summary'],
+                    'compression': result['compression']
+                })
         
         # Comparison table
         print("\n" + "="*80)
         print("📊 COMPARISON TABLE")
         print("="*80)
         
-        print(f"\n{'Metric':<25} ", end='')
-        for i in range(len(self.configs)):
-            print(f"Config {i+1:<10}", end=' ')
-        print()
-        print("-" * 80)
-        
         metrics = [
             ('F1 Score', 'avg_f1_score', '.3f'),
             ('Precision', 'avg_precision', '.3f'),
@@ -64,44 +141,51 @@ class ConfigComparator:
             ('Token Savings %', 'token_savings_percent', '.1f'),
         ]
         
-        for metric_name, metric_key, fmt in metrics:
-            print(f"{metric_name:<25} ", end='')
-            for result in results:
-                if metric_key in result['summary']:
-                    value = result['summary'][metric_key]
-                elif metric_key in result['compression']:
-                    value = result['compression'][metric_key]
-                else:
-                    value = 0
-                
-                print(f"{value:{fmt}:<12}", end=' ')
-            print()
+        # One (metrics x configs) matrix filled in a single pass over results;
+        # summary values win over compression ones
+        metric_keys = [metric_key for _, metric_key, _ in metrics]
+        columns = []
+        for result in results:
+            merged = {**result['compression'], **result['summary']}
+            columns.append([merged.get(metric_key, 0) for metric_key in metric_keys])
+        values = np.array(columns, dtype=np.float64).reshape(len(results), len(metrics)).T
+        row = {metric_key: i for i, metric_key in enumerate(metric_keys)}
         
-        print("-" * 80)
+        # Assemble the whole table and emit it with a single write
+        lines = [
+            f"\n{'Metric':<25} " + ''.join(f"{f'Config {i+1}':<12} " for i in range(len(results))),
+            "-" * 80,
+        ]
+        for (metric_name, _, fmt), metric_values in zip(metrics, values):
+            lines.append(f"{metric_name:<25} " + ''.join(f"{format(value, fmt):<12} " for value in metric_values))
+        lines.append("-" * 80)
+        sys.stdout.write('\n'.join(lines) + '\n')
         
         # Recommendation
         print("\n💡 RECOMMENDATION")
         print("="*80)
         
-        best_f1_idx = max(range(len(results)), key=lambda i: results[i]['summary']['avg_f1_score'])
-        best_latency_idx = min(range(len(results)), key=lambda i: results[i]['summary']['avg_latency_ms'])
-        best_compression_idx = max(range(len(results)), key=lambda i: results[i]['compression']['savings_percent'])
+        f1 = values[row['avg_f1_score']]
+        latency = values[row['avg_latency_ms']]
+        compression_ratio = values[row['compression_ratio']]
+        # token_savings_percent mirrors compression['savings_percent']
+        savings = values[row['token_savings_percent']]
+        
+        best_f1_idx = int(f1.argmax())
+        best_latency_idx = int(latency.argmin())
+        best_compression_idx = int(savings.argmax())
         
         print(f"🏆 Best F1 Score: Config {best_f1_idx + 1}")
         print(f"⚡ Fastest: Config {best_latency_idx + 1}")
         print(f"💾 Best Compression: Config {best_compression_idx + 1}")
         
         # Overall winner (balanced)
-        for i, result in enumerate(results):
-            s = result['summary']
-            # Score = F1 * 0.5 + (1 - latency_norm) * 0.3 + compression * 0.2
-            f1_norm = s['avg_f1_score']
-            latency_norm = s['avg_latency_ms'] / max(r['summary']['avg_latency_ms'] for r in results)
-            comp_norm = result['compression']['compression_ratio']
-            
-            result['balanced_score'] = f1_norm * 0.5 + (1 - latency_norm) * 0.3 + comp_norm * 0.2
+        # Score = F1 * 0.5 + (1 - latency_norm) * 0.3 + compression * 0.2
+        balanced = f1 * 0.5 + (1 - latency / latency.max()) * 0.3 + compression_ratio * 0.2
+        for result, score in zip(results, balanced):
+            result['balanced_score'] = float(score)
         
-        best_overall_idx = max(range(len(results)), key=lambda i: results[i]['balanced_score'])
+        best_overall_idx = int(balanced.argmax())
         
         print(f"\n🎯 Best Overall (balanced): Config {best_overall_idx + 1}")
         print(f"   Config: {results[best_overall_idx]['config']}")
@@ -125,8 +209,8 @@ class ConfigComparator:
         }
         
         report_file = f"comparison_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(report_file, 'wb', buffering=1 << 20) as f:
+            f.write(_dump_report(report))
         
         print(f"\n💾 Report saved: {report_file}")
         
@@ -153,12 +237,16 @@ PRESET_CONFIGS = {
     },
 }
 
+# Preset comparison order and its configs, resolved once at import
+_PRESET_ORDER = ('minimal', 'balanced', 'quality', 'performance')
+_PRESET_CONFIGS_LIST = tuple(PRESET_CONFIGS[k]['config'] for k in _PRESET_ORDER)
+
 
 def main():
     """Compare configurations."""
     if len(sys.argv) > 1 and sys.argv[1] == 'preset':
         # Compare preset configs
-        configs = [PRESET_CONFIGS[k]['config'] for k in ['minimal', 'balanced', 'quality', 'performance']]
+        configs = list(_PRESET_CONFIGS_LIST)
         print("\n🔧 Comparing preset configurations:")
         for k, v in PRESET_CONFIGS.items():
             print(f"  • {k}: {v['name']}")
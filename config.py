@@ -10,29 +10,15 @@ MEMORY_CONFIG = {
     'mid_term': {
         'max_size': 100,  # Number of summarized chunks to keep
         'summarize_every': 5,  # Summarize after this many messages
+        'quantize_embeddings': False,  # int8 search index (4x smaller, approximate scores)
+        'approximate_summary_embedding': False,  # Mean of message embeddings instead of embedding each summary
+        'merge_threshold': None,  # Cosine similarity above which a new summary merges into an existing chunk (None = off)
     },
     'long_term': {
         'enabled': False,  # Placeholder for future implementation
     }
 }
 
-# LLM Configuration
-LLM_CONFIG = {
-    'provider': 'openai',
-    'openai': {
-        'api_key': os.getenv('OPENAI_API_KEY', ''),  # Get from environment
-        'model': 'gpt-3.5-turbo',
-        'temperature': 0.7,
-    },
-    'anthropic': {
-        'api_key': os.getenv('ANTHROPIC_API_KEY', ''),
-        'model': 'claude-2',
-    },
-    'mock': {
-        'enabled': False,
-    }
-}
-
 # Database Configuration
 DATABASE_CONFIG = {
     'type': 'sqlite',  # Options: 'sqlite', 'postgres', 'mysql'
@@ -67,17 +53,20 @@ VECTOR_DB_CONFIG = {
 LLM_CONFIG = {
     'provider': 'openai',  # openai | anthropic | mock
     'openai': {
-        'api_key': None,  # Set to your API key or use OPENAI_API_KEY env var
+        'api_key': os.getenv('OPENAI_API_KEY') or None,  # Set to your API key or use OPENAI_API_KEY env var
         'model': 'gpt-3.5-turbo',  # gpt-3.5-turbo | gpt-4 | gpt-4-turbo
         'max_tokens': 500,
         'temperature': 0.7,
     },
     'anthropic': {
-        'api_key': None,  # Set to your API key or use ANTHROPIC_API_KEY env var
+        'api_key': os.getenv('ANTHROPIC_API_KEY') or None,  # Set to your API key or use ANTHROPIC_API_KEY env var
         'model': 'claude-3-sonnet-20240229',  # claude-3-opus | claude-3-sonnet | claude-3-haiku
         'max_tokens': 500,
         'temperature': 0.7,
     },
+    'mock': {
+        'enabled': False,
+    },
     'system_prompt': """You are a helpful AI assistant with access to conversation memory.
 Use the provided context to give accurate and relevant responses.
 If the context doesn't contain relevant information, say so politely.""",
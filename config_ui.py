@@ -5,30 +5,65 @@ Interactive Configuration Manager UI.
 Provides a Gradio interface to easily adjust system parameters.
 """
 
-import gradio as gr
-import yaml
-from utils.config_manager import ConfigManager
-from pathlib import Path
+from utils.config_manager import get_config
+
+
+# Getter defaults per section, in the order the UI widgets expect them
+_COMPRESSION_DEFAULTS = {
+    'enabled': True,
+    'strategy': 'score_based',
+    'max_tokens': 1000,
+    'preserve_recent': 3,
+    'importance_weight': 0.4,
+    'recency_weight': 0.3,
+    'relevance_weight': 0.3,
+}
+_STM_DEFAULTS = {
+    'max_items': 10,
+    'retention_time': 300,
+}
+_MTM_DEFAULTS = {
+    'max_chunks': 100,
+    'chunk_size': 5,
+    'importance_threshold': 0.5,
+}
+_SEMANTIC_SEARCH_DEFAULTS = {
+    'enabled': True,
+    'use_real_embeddings': True,
+    'similarity_threshold': 0.6,
+    'top_k_stm': 5,
+    'top_k_mtm': 3,
+}
+_RESPONSE_GEN_DEFAULTS = {
+    'model': 'gpt-4o-mini',
+    'temperature': 0.7,
+    'max_tokens': 500,
+}
+_LANGFUSE_DEFAULTS = {
+    'enabled': False,
+    'sample_rate': 1.0,
+    'environment': 'development',
+    'trace_llm_calls': True,
+    'trace_embeddings': True,
+    'trace_retrievals': True,
+}
 
 
 class ConfigUI:
     """Configuration UI manager."""
     
     def __init__(self):
-        self.config = ConfigManager()
+        # Shared process-wide manager, so repeated UIs don't re-parse the YAML
+        self.config = get_config()
+    
+    def _section_values(self, section, defaults):
+        """Values of ``defaults``' keys in order, with the section's overrides applied."""
+        merged = {**defaults, **self.config.get_section(section)}
+        return tuple(merged[key] for key in defaults)
     
     def get_compression_settings(self):
         """Get current compression settings."""
-        comp = self.config.get_section('compression')
-        return (
-            comp.get('enabled', True),
-            comp.get('strategy', 'score_based'),
-            comp.get('max_tokens', 1000),
-            comp.get('preserve_recent', 3),
-            comp.get('importance_weight', 0.4),
-            comp.get('recency_weight', 0.3),
-            comp.get('relevance_weight', 0.3)
-        )
+        return self._section_values('compression', _COMPRESSION_DEFAULTS)
     
     def update_compression_settings(self, enabled, strategy, max_tokens, preserve_recent,
                                    imp_weight, rec_weight, rel_weight):
@@ -46,15 +81,8 @@ class ConfigUI:
     
     def get_memory_settings(self):
         """Get current memory settings."""
-        stm = self.config.get_section('short_term_memory')
-        mtm = self.config.get_section('mid_term_memory')
-        return (
-            stm.get('max_items', 10),
-            stm.get('retention_time', 300),
-            mtm.get('max_chunks', 100),
-            mtm.get('chunk_size', 5),
-            mtm.get('importance_threshold', 0.5)
-        )
+        return (self._section_values('short_term_memory', _STM_DEFAULTS) +
+                self._section_values('mid_term_memory', _MTM_DEFAULTS))
     
     def update_memory_settings(self, stm_max, stm_retention, mtm_max, mtm_chunk_size, mtm_threshold):
         """Update memory settings."""
@@ -69,14 +97,7 @@ class ConfigUI:
     
     def get_semantic_search_settings(self):
         """Get semantic search settings."""
-        ss = self.config.get_section('semantic_search')
-        return (
-            ss.get('enabled', True),
-            ss.get('use_real_embeddings', True),
-            ss.get('similarity_threshold', 0.6),
-            ss.get('top_k_stm', 5),
-            ss.get('top_k_mtm', 3)
-        )
+        return self._section_values('semantic_search', _SEMANTIC_SEARCH_DEFAULTS)
     
     def update_semantic_search_settings(self, enabled, use_real, threshold, top_k_stm, top_k_mtm):
         """Update semantic search settings."""
@@ -91,12 +112,7 @@ class ConfigUI:
     
     def get_response_gen_settings(self):
         """Get response generation settings."""
-        rg = self.config.get_section('response_generation')
-        return (
-            rg.get('model', 'gpt-4o-mini'),
-            rg.get('temperature', 0.7),
-            rg.get('max_tokens', 500)
-        )
+        return self._section_values('response_generation', _RESPONSE_GEN_DEFAULTS)
     
     def update_response_gen_settings(self, model, temperature, max_tokens):
         """Update response generation settings."""
@@ -109,15 +125,7 @@ class ConfigUI:
     
     def get_langfuse_settings(self):
         """Get Langfuse settings."""
-        lf = self.config.get_section('langfuse')
-        return (
-            lf.get('enabled', False),
-            lf.get('sample_rate', 1.0),
-            lf.get('environment', 'development'),
-            lf.get('trace_llm_calls', True),
-            lf.get('trace_embeddings', True),
-            lf.get('trace_retrievals', True)
-        )
+        return self._section_values('langfuse', _LANGFUSE_DEFAULTS)
     
     def update_langfuse_settings(self, enabled, sample_rate, environment,
                                 trace_llm, trace_embed, trace_retrieve):
@@ -146,7 +154,10 @@ class ConfigUI:
     
     def view_current_config(self):
         """View current configuration."""
-        return yaml.dump(self.config.get_all(), default_flow_style=False, indent=2)
+        import yaml
+        from utils.config_manager import YamlDumper
+        return yaml.dump(self.config.get_all(), Dumper=YamlDumper,
+                         default_flow_style=False, indent=2, sort_keys=False)
     
     def validate_config(self):
         """Validate configuration."""
@@ -158,6 +169,9 @@ class ConfigUI:
 
 def create_ui():
     """Create Gradio interface."""
+    # Imported here so ConfigUI stays usable without loading Gradio
+    import gradio as gr
+    
     config_ui = ConfigUI()
     
     with gr.Blocks(title="Memory Layer Lab - Configuration", theme=gr.themes.Soft()) as demo:
@@ -3,26 +3,37 @@ Core modules for the Memory Layer system.
 
 This package contains the core functionality for managing different memory layers
 (short-term, mid-term, long-term) and their orchestration.
+
+Submodules are imported lazily on first attribute access, so
+``from core import ShortTermMemory`` only loads ``core.short_term``.
 """
 
-from .short_term import ShortTermMemory
-from .mid_term import MidTermMemory
-from .long_term import LongTermMemory
-from .summarizer import Summarizer
-from .orchestrator import MemoryOrchestrator
-from .preprocessor import InputPreprocessor
-from .aggregator import MemoryAggregator
-from .compressor import ContextCompressor
-from .synthesizer import ResponseSynthesizer
-
-__all__ = [
-    'ShortTermMemory',
-    'MidTermMemory',
-    'LongTermMemory',
-    'Summarizer',
-    'MemoryOrchestrator',
-    'InputPreprocessor',
-    'MemoryAggregator',
-    'ContextCompressor',
-    'ResponseSynthesizer',
-]
+import importlib
+
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    'ShortTermMemory': 'short_term',
+    'MidTermMemory': 'mid_term',
+    'LongTermMemory': 'long_term',
+    'Summarizer': 'summarizer',
+    'MemoryOrchestrator': 'orchestrator',
+    'InputPreprocessor': 'preprocessor',
+    'MemoryAggregator': 'aggregator',
+    'ContextCompressor': 'compressor',
+    'ResponseSynthesizer': 'synthesizer',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(f'.{_LAZY_IMPORTS[name]}', __name__)
+        value = getattr(module, name)
+        globals()[name] = value  # cache so later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
@@ -1,6 +1,36 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
+from collections import Counter, defaultdict
+import hashlib
+import string
+import unicodedata
 import numpy as np
 
+# Bump when the cache-stable layout changes, so old prefix hashes never match
+CONTEXT_PACK_VERSION = 2
+
+# Deletes ASCII punctuation in one C-level pass
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+
+
+def _tokenize(text: str) -> frozenset:
+    """NFC-normalized, lowercased, punctuation-free token set."""
+    return frozenset(unicodedata.normalize('NFC', text).lower().translate(_PUNCT_TABLE).split())
+
+
+def _token_fingerprint(tokens) -> int:
+    """64-bit signature with one bit set per token (by hash)."""
+    fingerprint = 0
+    for token in tokens:
+        fingerprint |= 1 << (hash(token) & 63)
+    return fingerprint
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two non-empty token sets (one set operation)."""
+    intersection = len(a & b)
+    return intersection / (len(a) + len(b) - intersection)
+
+
 class MemoryAggregator:
     """
     Aggregates and ranks context from multiple memory layers.
@@ -50,58 +80,44 @@ class MemoryAggregator:
         Returns:
             Aggregated context with ranking
         """
-        aggregated_items = []
+        has_query = query_embedding is not None and len(query_embedding) > 0
+        
+        # (source, weight, content key, score key, default relevance, items);
+        # layer scores are only trusted when there is a query to score against
+        layers = (
+            ('short_term', self.stm_weight, 'content', 'similarity', 1.0, stm_context),
+            ('mid_term', self.mtm_weight, 'summary', 'relevance_score', 0.8, mtm_context),
+            ('long_term', self.ltm_weight, 'content', 'relevance_score', 0.6, ltm_context or ()),
+        )
         
-        # Process STM items
-        for item in stm_context:
-            aggregated_items.append({
-                'content': item.get('content', ''),
-                'source': 'short_term',
-                'metadata': item.get('metadata', {}),
-                'timestamp': item.get('timestamp', ''),
-                'base_score': self.stm_weight,
-                'relevance_score': item.get('similarity', 1.0) if query_embedding else 1.0
-            })
-        
-        # Process MTM items
-        for item in mtm_context:
-            aggregated_items.append({
-                'content': item.get('summary', ''),
-                'source': 'mid_term',
-                'metadata': item.get('metadata', {}),
-                'timestamp': item.get('timestamp', ''),
-                'base_score': self.mtm_weight,
-                'relevance_score': item.get('relevance_score', 0.8) if query_embedding else 0.8
-            })
-        
-        # Process LTM items (if provided)
-        if ltm_context:
-            for item in ltm_context:
+        aggregated_items = []
+        for source, weight, content_key, score_key, default_score, context in layers:
+            for item in context:
+                relevance = item.get(score_key, default_score) if has_query else default_score
                 aggregated_items.append({
-                    'content': item.get('content', ''),
-                    'source': 'long_term',
+                    'content': item.get(content_key, ''),
+                    'source': source,
                     'metadata': item.get('metadata', {}),
                     'timestamp': item.get('timestamp', ''),
-                    'base_score': self.ltm_weight,
-                    'relevance_score': item.get('relevance_score', 0.6) if query_embedding else 0.6
+                    'base_score': weight,
+                    'relevance_score': relevance,
+                    'final_score': weight * relevance,
                 })
         
-        # Calculate final scores
-        for item in aggregated_items:
-            item['final_score'] = item['base_score'] * item['relevance_score']
-        
         # Deduplicate based on content similarity
         deduplicated = self._deduplicate(aggregated_items)
         
         # Sort by final score
         deduplicated.sort(key=lambda x: x['final_score'], reverse=True)
         
+        counts = Counter(i['source'] for i in deduplicated)
+        
         return {
             'items': deduplicated,
             'total_items': len(deduplicated),
-            'stm_count': sum(1 for i in deduplicated if i['source'] == 'short_term'),
-            'mtm_count': sum(1 for i in deduplicated if i['source'] == 'mid_term'),
-            'ltm_count': sum(1 for i in deduplicated if i['source'] == 'long_term'),
+            'stm_count': counts['short_term'],
+            'mtm_count': counts['mid_term'],
+            'ltm_count': counts['long_term'],
         }
     
     def _deduplicate(self, items: List[Dict[str, Any]], 
@@ -120,22 +136,44 @@ class MemoryAggregator:
             return []
         
         deduplicated = []
-        seen_contents = []
+        # (token set, size, fingerprint) of kept items, built once per item
+        seen = []
+        # Token -> indices into `seen` of kept items with that token in their prefix
+        prefix_index = defaultdict(list)
+        # Jaccard > threshold needs |A ^ B| < bound * (|A| + |B|)
+        bound = (1 - threshold) / (1 + threshold)
         
         for item in items:
-            content = item['content'].lower().strip()
+            tokens = _tokenize(item['content'])
+            size = len(tokens)
+            fingerprint = _token_fingerprint(tokens)
+            
+            # Prefix filter: two sets with Jaccard >= threshold share a token
+            # within the first |X| - floor(threshold * |X|) + 1 sorted tokens
+            # of each, so only kept items indexed under this prefix can match
+            prefix = sorted(tokens)[:size - int(threshold * size) + 1]
+            candidates = {idx for token in prefix for idx in prefix_index.get(token, ())}
             
-            # Check if similar to any seen content
+            # Check if similar to any candidate (Jaccard over token sets)
             is_duplicate = False
-            for seen in seen_contents:
-                similarity = self._text_similarity(content, seen)
-                if similarity > threshold:
+            for idx in candidates:
+                seen_tokens, seen_size, seen_fingerprint = seen[idx]
+                # Jaccard <= min(|A|, |B|) / max(|A|, |B|), so skip mismatched sizes
+                if size <= threshold * seen_size or seen_size <= threshold * size:
+                    continue
+                # Each differing fingerprint bit needs a token outside the
+                # intersection, so the popcount never overestimates |A ^ B|
+                if (fingerprint ^ seen_fingerprint).bit_count() >= bound * (size + seen_size):
+                    continue
+                if _jaccard(tokens, seen_tokens) > threshold:
                     is_duplicate = True
                     break
             
             if not is_duplicate:
+                for token in prefix:
+                    prefix_index[token].append(len(seen))
                 deduplicated.append(item)
-                seen_contents.append(content)
+                seen.append((tokens, size, fingerprint))
         
         return deduplicated
     
@@ -154,14 +192,13 @@ class MemoryAggregator:
             return 0.0
         
         # Tokenize
-        tokens1 = set(text1.split())
-        tokens2 = set(text2.split())
+        tokens1 = _tokenize(text1)
+        tokens2 = _tokenize(text2)
         
-        # Jaccard similarity
-        intersection = len(tokens1 & tokens2)
-        union = len(tokens1 | tokens2)
+        if not tokens1 or not tokens2:
+            return 0.0
         
-        return intersection / union if union > 0 else 0.0
+        return _jaccard(tokens1, tokens2)
     
     def format_for_llm(self, aggregated_context: Dict[str, Any], 
                        max_items: Optional[int] = None) -> str:
@@ -186,27 +223,106 @@ class MemoryAggregator:
         parts = []
         parts.append("=== Context from Memory Layers ===\n")
         
-        # Group by source
-        stm_items = [i for i in items if i['source'] == 'short_term']
-        mtm_items = [i for i in items if i['source'] == 'mid_term']
-        ltm_items = [i for i in items if i['source'] == 'long_term']
+        # Group by source in one pass, keeping only as many as each section shows
+        stm_items, mtm_items, ltm_items = [], [], []
+        groups = {'short_term': (stm_items, 5), 'mid_term': (mtm_items, 3), 'long_term': (ltm_items, 2)}
+        for item in items:
+            group = groups.get(item['source'])
+            if group and len(group[0]) < group[1]:
+                group[0].append(item)
         
         # Format STM
         if stm_items:
             parts.append("\n[Recent Conversation]")
-            for i, item in enumerate(stm_items[:5], 1):
+            for i, item in enumerate(stm_items, 1):
                 parts.append(f"{i}. {item['content']} (score: {item['final_score']:.2f})")
         
         # Format MTM
         if mtm_items:
             parts.append("\n[Previous Context]")
-            for i, item in enumerate(mtm_items[:3], 1):
+            for i, item in enumerate(mtm_items, 1):
                 parts.append(f"{i}. {item['content']} (score: {item['final_score']:.2f})")
         
         # Format LTM
         if ltm_items:
             parts.append("\n[Long-term Knowledge]")
-            for i, item in enumerate(ltm_items[:2], 1):
+            for i, item in enumerate(ltm_items, 1):
                 parts.append(f"{i}. {item['content']} (score: {item['final_score']:.2f})")
         
         return "\n".join(parts)
+    
+    def format_cache_stable(self,
+                            ltm_facts: List[Dict[str, Any]],
+                            mtm_chunks: List[Dict[str, Any]],
+                            recent_messages: List[Dict[str, Any]],
+                            query: Optional[str] = None,
+                            max_prefix_tokens: Optional[int] = None,
+                            estimate_tokens: Optional[Callable[[str], int]] = None) -> Dict[str, Any]:
+        """
+        Format context so consecutive turns share a byte-identical prefix.
+        
+        The prefix holds the stored LTM facts (sorted by id, or content) and
+        then the MTM summaries (oldest first), independent of the query. With
+        max_prefix_tokens, lines are taken in that order until the next one
+        would exceed the budget. The suffix holds the STM tail, minus anything
+        already in the prefix, followed by the query. Scores are left out,
+        since they change with every query.
+        
+        Args:
+            ltm_facts: Every current LTM fact ('content', optional 'id')
+            mtm_chunks: Every current MTM chunk ('summary'), in insertion order
+            recent_messages: STM messages ('content'), oldest first
+            query: Current query, emitted last
+            max_prefix_tokens: Token budget for the prefix (None = unbounded)
+            estimate_tokens: Token estimate per line (default ~4 characters per token)
+            
+        Returns:
+            Dictionary with 'prefix', 'suffix', 'text', 'prefix_hash' and 'version'
+        """
+        ltm_lines = [str(fact.get('content', '')) for fact in
+                     sorted(ltm_facts, key=lambda f: str(f.get('id', f.get('content', ''))))]
+        mtm_lines = [str(chunk.get('summary', '')) for chunk in mtm_chunks]
+        
+        if max_prefix_tokens is not None:
+            estimate = estimate_tokens or (lambda text: len(text) // 4)
+            budget, n_kept = max_prefix_tokens, 0
+            for line in ltm_lines + mtm_lines:
+                budget -= estimate(line)
+                if budget < 0:
+                    break
+                n_kept += 1
+            mtm_lines = mtm_lines[:max(n_kept - len(ltm_lines), 0)]
+            ltm_lines = ltm_lines[:n_kept]
+        
+        prefix_parts = ["=== Context from Memory Layers ===\n"]
+        if ltm_lines:
+            prefix_parts.append("\n[Long-term Knowledge]")
+            prefix_parts.extend(f"- {line}" for line in ltm_lines)
+        if mtm_lines:
+            prefix_parts.append("\n[Previous Context]")
+            prefix_parts.extend(f"- {line}" for line in mtm_lines)
+        prefix = "\n".join(prefix_parts) + "\n"
+        
+        in_prefix = set(ltm_lines) | set(mtm_lines)
+        recent = [str(msg.get('content', '')) for msg in recent_messages]
+        recent = [line for line in recent if line not in in_prefix]
+        
+        suffix_parts = []
+        if recent:
+            suffix_parts.append("\n[Recent Conversation]")
+            suffix_parts.extend(f"- {line}" for line in recent)
+        if query:
+            suffix_parts.append("\n[Current Query]")
+            suffix_parts.append(query)
+        suffix = "\n".join(suffix_parts)
+        
+        digest = hashlib.sha256(f"v{CONTEXT_PACK_VERSION}\n{prefix}".encode('utf-8')).hexdigest()
+        has_content = bool(ltm_lines or mtm_lines or suffix_parts)
+        
+        return {
+            'prefix': prefix,
+            'suffix': suffix,
+            'text': prefix + suffix if has_content else "",
+            'prefix_hash': digest,
+            'version': CONTEXT_PACK_VERSION,
+        }
@@ -1,5 +1,15 @@
 from typing import List, Dict, Any, Optional
 import re
+import numpy as np
+from .aggregator import _tokenize, _jaccard
+
+# Marker shown next to each item in format_compressed
+_SOURCE_TAGS = {
+    'short_term': '🔴',
+    'mid_term': '🟡',
+    'long_term': '🟢'
+}
+
 
 class ContextCompressor:
     """
@@ -48,6 +58,10 @@ class ContextCompressor:
                 'strategy': self.strategy
             }
         
+        # Estimate each item's tokens once on shallow copies, so the
+        # caller's items are left untouched; strategies and metrics reuse it
+        items = [{**item, 'token_count': self._estimate_tokens(item['content'])} for item in items]
+        
         # Apply compression strategy
         if self.strategy == 'truncate':
             compressed = self._truncate_compress(items)
@@ -59,8 +73,8 @@ class ContextCompressor:
             compressed = self._score_based_compress(items, preserve_recent)
         
         # Calculate metrics
-        original_tokens = sum(self._estimate_tokens(item['content']) for item in items)
-        compressed_tokens = sum(self._estimate_tokens(item['content']) for item in compressed)
+        original_tokens = sum(item['token_count'] for item in items)
+        compressed_tokens = sum(item['token_count'] for item in compressed)
         
         return {
             'compressed_items': compressed,
@@ -77,24 +91,31 @@ class ContextCompressor:
         Simple truncation: keep items until token budget is reached.
         
         Args:
-            items: List of items (should be pre-sorted by score)
+            items: List of items (should be pre-sorted by score, with 'token_count')
             
         Returns:
             Compressed list
         """
-        compressed = []
-        token_count = 0
+        return items[:self._fit_prefix(items, self.max_tokens)]
+    
+    @staticmethod
+    def _fit_prefix(items: List[Dict[str, Any]], budget: int) -> int:
+        """
+        Count the leading items whose running token total stays within budget.
         
-        for item in items:
-            item_tokens = self._estimate_tokens(item['content'])
+        Args:
+            items: List of items with 'token_count'
+            budget: Token budget
             
-            if token_count + item_tokens <= self.max_tokens:
-                compressed.append(item)
-                token_count += item_tokens
-            else:
-                break
-        
-        return compressed
+        Returns:
+            Number of items to keep
+        """
+        total = 0
+        for count, item in enumerate(items):
+            total += item['token_count']
+            if total > budget:
+                return count
+        return len(items)
     
     def _score_based_compress(self, 
                               items: List[Dict[str, Any]],
@@ -122,19 +143,13 @@ class ContextCompressor:
             
             # Add recent items first
             for item in recent_items[-3:]:  # Keep last 3 recent
-                item_tokens = self._estimate_tokens(item['content'])
+                item_tokens = item['token_count']
                 if token_count + item_tokens <= self.max_tokens:
                     compressed.append(item)
                     token_count += item_tokens
             
-            # Add high-scoring others
-            for item in other_items:
-                item_tokens = self._estimate_tokens(item['content'])
-                if token_count + item_tokens <= self.max_tokens:
-                    compressed.append(item)
-                    token_count += item_tokens
-                else:
-                    break
+            # Add high-scoring others until the first one that doesn't fit
+            compressed.extend(other_items[:self._fit_prefix(other_items, self.max_tokens - token_count)])
             
             return compressed
         else:
@@ -155,9 +170,81 @@ class ContextCompressor:
         Returns:
             Compressed list with diversity
         """
-        # For now, use score-based with diversity consideration
-        # TODO: Implement proper MMR algorithm
-        return self._score_based_compress(items, preserve_recent)
+        if preserve_recent:
+            # Same split as score-based: last 3 STM items are kept, older STM dropped
+            recent_items = [i for i in items if i['source'] == 'short_term'][-3:]
+            pool = [i for i in items if i['source'] != 'short_term']
+        else:
+            recent_items, pool = [], list(items)
+        
+        compressed = []
+        token_count = 0
+        for item in recent_items:
+            if token_count + item['token_count'] <= self.max_tokens:
+                compressed.append(item)
+                token_count += item['token_count']
+        
+        if not pool:
+            return compressed
+        
+        # Similarities among everything already kept plus the candidate pool
+        n_kept = len(compressed)
+        similarity = self._similarity_matrix(compressed + pool)
+        relevance = np.array([i['final_score'] for i in pool], dtype=np.float64)
+        
+        # Highest similarity of each candidate to anything selected so far
+        if n_kept:
+            redundancy = similarity[n_kept:, :n_kept].max(axis=1)
+        else:
+            redundancy = np.zeros(len(pool))
+        
+        budget = self.max_tokens - token_count
+        remaining = np.ones(len(pool), dtype=bool)
+        while remaining.any():
+            mmr = lambda_param * relevance - (1 - lambda_param) * redundancy
+            mmr[~remaining] = -np.inf
+            best = int(mmr.argmax())
+            remaining[best] = False
+            
+            item = pool[best]
+            if item['token_count'] > budget:
+                continue
+            compressed.append(item)
+            budget -= item['token_count']
+            np.maximum(redundancy, similarity[n_kept:, n_kept + best], out=redundancy)
+        
+        return compressed
+    
+    def _similarity_matrix(self, items: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Pairwise similarity between items for MMR.
+        
+        Uses cosine similarity when every item carries a metadata embedding of
+        the same size, otherwise Jaccard similarity of content tokens.
+        
+        Args:
+            items: List of items
+            
+        Returns:
+            (n, n) similarity matrix
+        """
+        embeddings = [item.get('metadata', {}).get('embedding') for item in items]
+        if all(e is not None and len(e) > 0 for e in embeddings) and len({len(e) for e in embeddings}) == 1:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+            return matrix @ matrix.T
+        
+        # Same tokenization as the aggregator's dedupe, so both agree on overlap
+        token_sets = [_tokenize(item['content']) for item in items]
+        similarity = np.eye(len(items))
+        for i, a in enumerate(token_sets):
+            for j in range(i + 1, len(token_sets)):
+                b = token_sets[j]
+                if a and b:
+                    similarity[i, j] = similarity[j, i] = _jaccard(a, b)
+        return similarity
     
     def _estimate_tokens(self, text: str) -> int:
         """
@@ -193,11 +280,7 @@ class ContextCompressor:
         parts.append(f"Compression: {compressed_context['compression_ratio']:.1%}\n")
         
         for i, item in enumerate(items, 1):
-            source_tag = {
-                'short_term': '🔴',
-                'mid_term': '🟡',
-                'long_term': '🟢'
-            }.get(item['source'], '⚪')
+            source_tag = _SOURCE_TAGS.get(item['source'], '⚪')
             
             parts.append(f"{i}. {source_tag} [{item['source']}] (score: {item['final_score']:.2f})")
             parts.append(f"   {item['content'][:200]}...")
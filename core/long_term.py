@@ -88,7 +88,7 @@ class LongTermMemory:
         results = []
         
         # Search in vector database if available
-        if self.vecdb_enabled and query_embedding and self.vector_db:
+        if self.vecdb_enabled and query_embedding is not None and self.vector_db:
             try:
                 vec_results = self.vector_db.search(query_embedding, top_k)
                 results.extend(vec_results)
@@ -1,11 +1,21 @@
-from typing import List, Dict, Any, Optional
+from typing import Deque, List, Dict, Any, Optional, Tuple
+from collections import deque
 from datetime import datetime
+from itertools import islice
 import json
 import numpy as np
 import logging
+from .preprocessor import InputPreprocessor
 
 logger = logging.getLogger(__name__)
 
+# Optional SIMD similarity kernels
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+
 class MidTermMemory:
     """
     Manages mid-term memory for the chatbot.
@@ -17,7 +27,8 @@ class MidTermMemory:
                  max_size: int = 100,
                  temporal_graph=None,
                  knowledge_graph=None,
-                 mtm_query=None):
+                 mtm_query=None,
+                 quantize_embeddings: bool = False):
         """
         Initialize mid-term memory.
         
@@ -26,9 +37,15 @@ class MidTermMemory:
             temporal_graph: TemporalGraph instance (optional)
             knowledge_graph: KnowledgeGraph instance (optional)
             mtm_query: MTMQuery instance (optional)
+            quantize_embeddings: Keep the search index as int8 (4x smaller, approximate scores)
         """
         self.max_size = max_size
-        self.chunks: List[Dict[str, Any]] = []
+        self.quantize_embeddings = quantize_embeddings
+        # Oldest chunks fall off the left once max_size is reached
+        self.chunks: Deque[Dict[str, Any]] = deque(maxlen=max_size)
+        # (unit-norm embedding matrix, int8 row scales or None, indexed chunks);
+        # rebuilt lazily after changes
+        self._index: Optional[Tuple[np.ndarray, Optional[np.ndarray], List[Dict[str, Any]]]] = None
         
         # Neo4j integration (optional)
         self.temporal_graph = temporal_graph
@@ -52,11 +69,11 @@ class MidTermMemory:
         }
         
         # Add embedding if provided
-        if embedding:
+        if embedding is not None and len(embedding) > 0:
             chunk['embedding'] = embedding
         
         self.chunks.append(chunk)
-        self._enforce_limits()
+        self._index = None
     
     def get_recent_chunks(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -68,7 +85,8 @@ class MidTermMemory:
         Returns:
             List of chunk dictionaries, most recent last.
         """
-        return self.chunks[-(n or len(self.chunks)):]
+        n = n or len(self.chunks)
+        return list(islice(self.chunks, max(0, len(self.chunks) - n), None))
     
     def search_by_embedding(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -82,32 +100,127 @@ class MidTermMemory:
         Returns:
             List of chunks sorted by similarity with scores
         """
-        results = []
+        if top_k <= 0:
+            return []
+        similarities, indexed = self._similarities(query_embedding)
+        if not indexed:
+            return []
         
-        # Search in local chunks
-        if self.chunks:
-            for chunk in self.chunks:
-                # Check if embedding exists (either in chunk or metadata for backwards compatibility)
-                chunk_embedding = chunk.get('embedding') or chunk.get('metadata', {}).get('embedding')
-                if chunk_embedding:
-                    similarity = self._cosine_similarity(query_embedding, chunk_embedding)
-                    results.append({
-                        'chunk': chunk,
-                        'similarity': similarity,
-                        'source': 'local'
-                    })
-        
-        # Sort by similarity
-        results.sort(key=lambda x: x['similarity'], reverse=True)
+        # Only the top-k need ordering; ties keep insertion order
+        if top_k < len(indexed):
+            top = np.sort(np.argpartition(-similarities, top_k - 1)[:top_k])
+        else:
+            top = np.arange(len(indexed))
+        top = top[np.argsort(-similarities[top], kind='stable')]
         
         # Return top-k with scores
         return [{
-            'summary': r['chunk']['summary'],
-            'metadata': r['chunk']['metadata'],
-            'timestamp': r['chunk']['timestamp'],
-            'relevance_score': r['similarity'],
-            'source': r.get('source', 'local')
-        } for r in results[:top_k]]
+            'summary': indexed[i]['summary'],
+            'metadata': indexed[i]['metadata'],
+            'timestamp': indexed[i]['timestamp'],
+            'relevance_score': float(similarities[i]),
+            'source': 'local'
+        } for i in top]
+    
+    def find_near_duplicate(self, embedding: List[float], threshold: float = 0.95) -> Optional[Dict[str, Any]]:
+        """
+        Find the stored chunk most similar to an embedding, if it is close enough.
+        
+        Args:
+            embedding: Embedding of a candidate chunk
+            threshold: Minimum cosine similarity to count as a duplicate
+            
+        Returns:
+            The matching chunk, or None
+        """
+        similarities, indexed = self._similarities(embedding)
+        if not indexed:
+            return None
+        best = int(similarities.argmax())
+        return indexed[best] if similarities[best] > threshold else None
+    
+    def merge_chunk(self, chunk: Dict[str, Any], metadata: Dict[str, Any]) -> None:
+        """
+        Fold a near-duplicate summary's metadata into an existing chunk.
+        
+        The chunk keeps its summary and embedding, so the search index stays valid.
+        
+        Args:
+            chunk: Chunk returned by find_near_duplicate
+            metadata: Metadata of the summary being merged
+        """
+        merged = chunk['metadata']
+        merged['message_count'] = merged.get('message_count', 0) + metadata.get('message_count', 0)
+        if 'topics' in metadata:
+            # Keep a JSON-friendly list, capped like extract_key_topics
+            merged['topics'] = list(dict.fromkeys([*merged.get('topics', ()), *metadata['topics']]))[:10]
+    
+    def _similarities(self, query_embedding: List[float]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """
+        Cosine similarity of a query against every indexed chunk.
+        
+        Returns:
+            (similarities, chunks in row order)
+        """
+        matrix, scales, indexed = self._embedding_index()
+        if not indexed:
+            return np.empty(0, dtype=np.float32), indexed
+        
+        # Rows are unit length, so cosine similarity is a plain dot product
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            # A zero query has no direction: every chunk scores 0, like zero rows
+            return np.zeros(len(indexed), dtype=np.float32), indexed
+        query = query / query_norm
+        if scales is not None:
+            # Quantize the query the same way and rescale the integer dot products
+            query, query_scale = InputPreprocessor.quantize(query)
+            if simsimd is not None:
+                similarities = np.asarray(simsimd.cdist(matrix, query[None, :], metric='dot')).ravel()
+            else:
+                similarities = (matrix.astype(np.int32) @ query.astype(np.int32)).astype(np.float32)
+            similarities *= scales * query_scale
+        elif simsimd is not None:
+            similarities = np.asarray(simsimd.cdist(matrix, query[None, :], metric='dot')).ravel()
+        else:
+            similarities = matrix @ query
+        
+        return similarities, indexed
+    
+    def _embedding_index(self) -> Tuple[np.ndarray, Optional[np.ndarray], List[Dict[str, Any]]]:
+        """
+        Stack L2-normalized chunk embeddings into a matrix for vectorized search.
+        
+        Built on first use and reused until chunks change.
+        
+        Returns:
+            (unit-norm embedding matrix, int8 row scales or None, chunks in row order)
+        """
+        if self._index is None:
+            indexed = []
+            vectors = []
+            for chunk in self.chunks:
+                # Check if embedding exists (either in chunk or metadata for backwards compatibility)
+                chunk_embedding = chunk.get('embedding')
+                if chunk_embedding is None:
+                    chunk_embedding = chunk.get('metadata', {}).get('embedding')
+                if chunk_embedding is not None and len(chunk_embedding) > 0:
+                    indexed.append(chunk)
+                    vectors.append(chunk_embedding)
+            
+            matrix = np.asarray(vectors, dtype=np.float32) if vectors else np.empty((0, 0), dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0  # zero vectors score 0 instead of NaN
+            matrix /= norms
+            
+            scales = None
+            if self.quantize_embeddings:
+                matrix, scales = InputPreprocessor.quantize(matrix)
+            
+            self._index = (matrix, scales, indexed)
+        
+        return self._index
     
     def get_graph_context(self, query: str, top_k: int = 5) -> Dict[str, Any]:
         """
@@ -168,31 +281,32 @@ class MidTermMemory:
             'match_score': r['match_score']
         } for r in results[:top_k]]
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        v1 = np.array(vec1)
-        v2 = np.array(vec2)
-        return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
-    
     def clear(self) -> None:
         """Clear all chunks from mid-term memory."""
-        self.chunks = []
-    
-    def _enforce_limits(self) -> None:
-        """Ensure memory doesn't exceed max_size."""
-        while len(self.chunks) > self.max_size:
-            self.chunks.pop(0)
+        self.chunks.clear()
+        self._index = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Serialize memory to a dictionary."""
         return {
-            'chunks': self.chunks,
+            'chunks': [self._serializable(chunk) for chunk in self.chunks],
             'max_size': self.max_size,
+            'quantize_embeddings': self.quantize_embeddings,
         }
     
+    @staticmethod
+    def _serializable(chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """The chunk, with ndarray embeddings copied out as lists for JSON."""
+        if isinstance(chunk.get('embedding'), np.ndarray):
+            chunk = {**chunk, 'embedding': chunk['embedding'].tolist()}
+        if isinstance(chunk['metadata'].get('embedding'), np.ndarray):
+            chunk = {**chunk, 'metadata': {**chunk['metadata'], 'embedding': chunk['metadata']['embedding'].tolist()}}
+        return chunk
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'MidTermMemory':
         """Deserialize memory from a dictionary."""
-        instance = cls(max_size=data.get('max_size', 100))
-        instance.chunks = data.get('chunks', [])
+        instance = cls(max_size=data.get('max_size', 100),
+                       quantize_embeddings=data.get('quantize_embeddings', False))
+        instance.chunks.extend(data.get('chunks', []))
         return instance
@@ -6,8 +6,11 @@ FULL integration of STM ↔ MTM ↔ LTM for complete LLM context.
 """
 
 from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import time
 import logging
+import numpy as np
 from .short_term import ShortTermMemory
 from .mid_term import MidTermMemory
 from .long_term import LongTermMemory
@@ -18,6 +21,25 @@ from .compressor import ContextCompressor
 
 logger = logging.getLogger(__name__)
 
+# Sessions whose last emitted prefix get_context_delta remembers (LRU)
+_MAX_DELTA_SESSIONS = 256
+
+# Substrings (of the lowercased text) that make an assistant message worth keeping in LTM
+_KNOWLEDGE_KEYWORDS = (
+    'architecture', 'design', 'pattern',
+    'fix', 'solution', 'implement',
+    'guideline', 'best practice', 'recommendation',
+    'function', 'class', 'module',
+    'bug', 'error', 'issue',
+)
+
+# (category, keywords) in priority order; unmatched knowledge is a 'guideline'
+_LTM_CATEGORY_RULES = (
+    ('function', ('function', 'method')),
+    ('architecture', ('architecture', 'design')),
+    ('commit_log', ('bug', 'fix')),
+)
+
 
 class EnhancedMemoryOrchestrator:
     """
@@ -40,7 +62,9 @@ class EnhancedMemoryOrchestrator:
                  compressor: Optional[ContextCompressor] = None,
                  summarize_every: int = 5,
                  ltm_top_k: int = 5,
-                 ltm_strategy: str = 'hybrid'):
+                 ltm_strategy: str = 'hybrid',
+                 mtm_merge_threshold: Optional[float] = None,
+                 approximate_summary_embedding: bool = False):
         """
         Initialize enhanced orchestrator.
         
@@ -55,6 +79,10 @@ class EnhancedMemoryOrchestrator:
             summarize_every: Messages before summarization
             ltm_top_k: Number of LTM facts to retrieve
             ltm_strategy: LTM retrieval strategy ('vector', 'graph', 'hybrid')
+            mtm_merge_threshold: Cosine similarity above which a new summary is
+                merged into an existing MTM chunk (None = always add)
+            approximate_summary_embedding: Use the normalized mean of the STM
+                message embeddings instead of embedding the summary text
         """
         self.short_term = short_term
         self.mid_term = mid_term
@@ -66,15 +94,24 @@ class EnhancedMemoryOrchestrator:
         
         self.summarize_every = summarize_every
         self.message_count = 0
+        self.mtm_merge_threshold = mtm_merge_threshold
+        self.approximate_summary_embedding = approximate_summary_embedding
         
         # LTM configuration
         self.ltm_top_k = ltm_top_k
         self.ltm_strategy = ltm_strategy
         
+        # Worker for remote (hybrid) LTM queries, created on first use
+        self._ltm_pool: Optional[ThreadPoolExecutor] = None
+        
+        # Last cache-stable prefix sent per session: session_id -> (prefix, prefix_hash),
+        # least recently used first
+        self._last_emit: 'OrderedDict[str, tuple]' = OrderedDict()
+        
         logger.info(f"✅ Enhanced orchestrator initialized with LTM integration")
         logger.info(f"   LTM strategy: {ltm_strategy}, top_k: {ltm_top_k}")
     
-    def add_message(self, role: str, content: str, **metadata) -> None:
+    def add_message(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
         """
         Add message and manage memory layers.
         
@@ -83,26 +120,46 @@ class EnhancedMemoryOrchestrator:
         2. Check if summarization needed
         3. Summarize STM → MTM
         4. Extract entities → LTM (if applicable)
+        
+        Args:
+            role: 'user' or 'assistant'
+            content: Message content
+            metadata: Optional message metadata (e.g. 'embedding', 'intent')
+        """
+        summarized = self._ingest(role, content, metadata or {})
+        if summarized:
+            self._store_summary(*summarized)
+    
+    def _ingest(self, role: str, content: str, metadata: dict) -> Optional[tuple]:
+        """
+        Add one message to STM (and LTM if worthy) and summarize when due.
+        
+        Returns:
+            (summary, chunk metadata) as from _summarize_stm, or None
         """
         # Add to STM
-        self.short_term.add(role, content, **metadata)
+        self.short_term.add(role, content, metadata)
         self.message_count += 1
         
         # Periodically summarize
+        summarized = None
         if self.message_count >= self.summarize_every:
-            self._summarize_and_move()
+            summarized = self._summarize_stm()
             self.message_count = 0
         
         # Extract knowledge for LTM (if important)
         if self._is_knowledge_worthy(role, content, metadata):
             self._extract_to_ltm(role, content, metadata)
+        
+        return summarized
     
     def get_context(self,
                     query: Optional[str] = None,
                     n_recent: Optional[int] = None,
                     n_chunks: Optional[int] = 3,
                     use_ltm: bool = True,
-                    use_embedding_search: bool = False) -> Dict[str, Any]:
+                    use_embedding_search: bool = False,
+                    compress: bool = True) -> Dict[str, Any]:
         """
         Build COMPLETE context from all memory layers.
         
@@ -112,21 +169,21 @@ class EnhancedMemoryOrchestrator:
             n_chunks: Number of MTM chunks
             use_ltm: Include LTM in context
             use_embedding_search: Use embedding-based retrieval
+            compress: Run the compressor ('compressed' is None when False)
             
         Returns:
             Complete context from STM + MTM + LTM
         """
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         
         # Generate query embedding if needed
         query_embedding = None
         if query and use_embedding_search:
-            query_obj = self.preprocessor.preprocess(query)
-            query_embedding = query_obj['embedding']
+            query_embedding = self._embed_query(query)
         
         # STEP 1: Retrieve from all layers
         logger.debug("Retrieving from memory layers...")
-        retrieval_start = time.time()
+        retrieval_start = time.perf_counter_ns()
         
         stm_context, mtm_context, ltm_context = self._retrieve_from_all_layers(
             query=query,
@@ -137,30 +194,31 @@ class EnhancedMemoryOrchestrator:
             use_embedding_search=use_embedding_search
         )
         
-        retrieval_time = time.time() - retrieval_start
+        retrieval_time = time.perf_counter_ns() - retrieval_start
         
         # STEP 2: Aggregate contexts
-        agg_start = time.time()
+        agg_start = time.perf_counter_ns()
         aggregated = self.aggregator.aggregate(
             stm_context=stm_context,
             mtm_context=mtm_context,
             ltm_context=ltm_context,  # ✅ LTM included!
             query_embedding=query_embedding
         )
-        agg_time = time.time() - agg_start
+        agg_time = time.perf_counter_ns() - agg_start
         
         # STEP 3: Compress if needed
-        comp_start = time.time()
-        compressed = self.compressor.compress(aggregated)
-        comp_time = time.time() - comp_start
+        comp_start = time.perf_counter_ns()
+        compressed = self.compressor.compress(aggregated) if compress else None
+        comp_time = time.perf_counter_ns() - comp_start
         
-        total_time = time.time() - start_time
+        total_time = time.perf_counter_ns() - start_time
         
         # Log stats
-        logger.debug(f"Context built: STM={aggregated.get('stm_count', 0)}, "
-                    f"MTM={aggregated.get('mtm_count', 0)}, "
-                    f"LTM={aggregated.get('ltm_count', 0)} "
-                    f"in {total_time*1000:.1f}ms")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Context built: STM={aggregated.get('stm_count', 0)}, "
+                         f"MTM={aggregated.get('mtm_count', 0)}, "
+                         f"LTM={aggregated.get('ltm_count', 0)} "
+                         f"in {total_time / 1e6:.1f}ms")
         
         return {
             'aggregated': aggregated,
@@ -170,10 +228,10 @@ class EnhancedMemoryOrchestrator:
             'mtm_count': aggregated.get('mtm_count', 0),
             'ltm_count': aggregated.get('ltm_count', 0),  # ✅ Track LTM
             'timing': {
-                'retrieval_ms': retrieval_time * 1000,
-                'aggregation_ms': agg_time * 1000,
-                'compression_ms': comp_time * 1000,
-                'total_ms': total_time * 1000
+                'retrieval_ms': retrieval_time / 1e6,
+                'aggregation_ms': agg_time / 1e6,
+                'compression_ms': comp_time / 1e6,
+                'total_ms': total_time / 1e6
             }
         }
     
@@ -182,18 +240,26 @@ class EnhancedMemoryOrchestrator:
                           n_recent: Optional[int] = None,
                           n_chunks: Optional[int] = 3,
                           use_ltm: bool = True,
-                          use_compression: bool = True) -> str:
+                          use_compression: bool = True,
+                          cache_stable: bool = False) -> str:
         """
         Get context as formatted string for LLM.
         
-        Returns complete context with STM + MTM + LTM.
+        Returns complete context with STM + MTM + LTM. With cache_stable the
+        layout from get_context_pack is used, so LLM prompt caches survive
+        between turns (n_chunks does not apply there).
         """
+        if cache_stable:
+            return self.get_context_pack(query=query, n_recent=n_recent, use_ltm=use_ltm,
+                                         use_compression=use_compression)['text']
+        
         context = self.get_context(
             query=query,
             n_recent=n_recent,
             n_chunks=n_chunks,
             use_ltm=use_ltm,
-            use_embedding_search=(query is not None)
+            use_embedding_search=(query is not None),
+            compress=use_compression
         )
         
         if use_compression:
@@ -201,6 +267,94 @@ class EnhancedMemoryOrchestrator:
         else:
             return self.aggregator.format_for_llm(context['aggregated'])
     
+    def get_context_pack(self,
+                         query: Optional[str] = None,
+                         n_recent: Optional[int] = None,
+                         use_ltm: bool = True,
+                         use_compression: bool = True) -> Dict[str, Any]:
+        """
+        Get context split into a cache-stable prefix and a per-turn suffix.
+        
+        The prefix is the stored LTM facts and MTM chunks in a fixed order,
+        so it does not depend on the query and only changes when memory
+        does. The STM tail and the query form the suffix. Callers can put a
+        prompt-cache marker at the end of 'prefix' and skip re-sending it
+        while 'prefix_hash' is unchanged.
+        
+        Args:
+            query: Current query, appended after the STM tail
+            n_recent: Number of recent STM messages (None = all)
+            use_ltm: Include LTM facts in the prefix
+            use_compression: Cap the prefix to the compressor's token budget
+            
+        Returns:
+            Dictionary with prefix, suffix, text, prefix_hash and version
+        """
+        return self.aggregator.format_cache_stable(
+            ltm_facts=self._stable_ltm_facts() if use_ltm else [],
+            mtm_chunks=list(self.mid_term.chunks),
+            recent_messages=self.short_term.get_recent(n_recent),
+            query=query,
+            max_prefix_tokens=self.compressor.max_tokens if use_compression else None,
+            estimate_tokens=self.compressor._estimate_tokens
+        )
+    
+    def _stable_ltm_facts(self) -> List[Dict[str, Any]]:
+        """Every fact currently held in LTM, as {'content', 'id'} dicts."""
+        if hasattr(self.long_term, 'facts'):
+            return [fact if isinstance(fact, dict) else {'content': str(fact)}
+                    for fact in self.long_term.facts]
+        store = getattr(self.long_term, 'store', None) or {}
+        return [{'content': str(entry.get('value', '')), 'id': key} for key, entry in store.items()]
+    
+    def get_context_delta(self,
+                          session_id: str = 'default',
+                          query: Optional[str] = None,
+                          n_recent: Optional[int] = None,
+                          use_ltm: bool = True,
+                          use_compression: bool = True) -> Dict[str, Any]:
+        """
+        Get cache-stable context, sending the prefix only when it changed.
+        
+        While the LTM + MTM prefix is byte-identical to the one last sent for
+        this session, 'delta' holds just the STM + query suffix and 'cached' is True;
+        the caller reuses the prefix it already holds under 'prefix_hash'.
+        Otherwise 'delta' is the full text and the session's prefix is replaced.
+        
+        Args:
+            session_id: Conversation the prefix cache is kept for
+            
+        Returns:
+            Dictionary with cached, prefix_hash, delta and text
+        """
+        pack = self.get_context_pack(query, n_recent, use_ltm, use_compression)
+        
+        last = self._last_emit.get(session_id)
+        cached = last is not None and last[0] == pack['prefix']
+        if not cached:
+            self._last_emit[session_id] = (pack['prefix'], pack['prefix_hash'])
+        self._last_emit.move_to_end(session_id)
+        if len(self._last_emit) > _MAX_DELTA_SESSIONS:
+            self._last_emit.popitem(last=False)
+        
+        return {
+            'cached': cached,
+            'prefix_hash': pack['prefix_hash'],
+            'delta': pack['suffix'] if cached else pack['text'],
+            'text': pack['text'],
+        }
+    
+    def _embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a query for layer search (memoized by the preprocessor's cache).
+        
+        Returns:
+            Read-only float32 embedding, shared by every layer search
+        """
+        embedding = np.asarray(self.preprocessor.preprocess(query)['embedding'], dtype=np.float32)
+        embedding.setflags(write=False)
+        return embedding
+    
     def _retrieve_from_all_layers(self,
                                   query: Optional[str],
                                   query_embedding: Optional[List[float]],
@@ -214,8 +368,16 @@ class EnhancedMemoryOrchestrator:
         Returns:
             (stm_context, mtm_context, ltm_context)
         """
+        # A hybrid LTM query goes out to the vector DB and graph, so start it
+        # first and let it overlap the in-memory STM/MTM searches
+        ltm_future = None
+        if use_ltm and self.long_term and getattr(self.long_term, 'hybrid_ltm', None):
+            ltm_future = self._ltm_executor().submit(
+                self._retrieve_from_ltm, query, query_embedding, use_embedding_search
+            )
+        
         # Retrieve from STM
-        if use_embedding_search and query_embedding:
+        if use_embedding_search and query_embedding is not None:
             stm_context = self.short_term.search_by_embedding(
                 query_embedding,
                 top_k=n_recent or 5
@@ -224,7 +386,7 @@ class EnhancedMemoryOrchestrator:
             stm_context = self.short_term.get_recent(n_recent)
         
         # Retrieve from MTM
-        if use_embedding_search and query_embedding:
+        if use_embedding_search and query_embedding is not None:
             mtm_context = self.mid_term.search_by_embedding(
                 query_embedding,
                 top_k=n_chunks or 3
@@ -234,7 +396,9 @@ class EnhancedMemoryOrchestrator:
         
         # ✅ Retrieve from LTM
         ltm_context = []
-        if use_ltm and self.long_term:
+        if ltm_future is not None:
+            ltm_context = ltm_future.result()
+        elif use_ltm and self.long_term:
             ltm_context = self._retrieve_from_ltm(
                 query=query,
                 query_embedding=query_embedding,
@@ -243,6 +407,30 @@ class EnhancedMemoryOrchestrator:
         
         return stm_context, mtm_context, ltm_context
     
+    def _ltm_executor(self) -> ThreadPoolExecutor:
+        """Single background worker for hybrid LTM queries."""
+        if self._ltm_pool is None:
+            self._ltm_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ltm-query')
+        return self._ltm_pool
+    
+    def close(self) -> None:
+        """Stop the background LTM worker (recreated on next use) and drop cached query embeddings."""
+        self.preprocessor.clear_cache()
+        if self._ltm_pool is not None:
+            self._ltm_pool.shutdown(wait=False)
+            self._ltm_pool = None
+    
+    def __enter__(self) -> 'EnhancedMemoryOrchestrator':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def __del__(self):
+        # Attribute may be missing if __init__ failed part-way
+        if getattr(self, '_ltm_pool', None) is not None:
+            self.close()
+    
     def _retrieve_from_ltm(self,
                           query: Optional[str],
                           query_embedding: Optional[List[float]],
@@ -262,7 +450,7 @@ class EnhancedMemoryOrchestrator:
                 return self._retrieve_from_hybrid_ltm(query, query_embedding)
             
             # Fallback to simple retrieval
-            if use_embedding_search and query_embedding:
+            if use_embedding_search and query_embedding is not None:
                 # Simple embedding search
                 if hasattr(self.long_term, 'search_by_embedding'):
                     return self.long_term.search_by_embedding(
@@ -321,26 +509,68 @@ class EnhancedMemoryOrchestrator:
     
     def _summarize_and_move(self) -> None:
         """Summarize STM → MTM."""
+        summarized = self._summarize_stm()
+        if summarized:
+            self._store_summary(*summarized)
+    
+    def _summarize_stm(self) -> Optional[tuple]:
+        """
+        Summarize the current STM messages.
+        
+        Returns:
+            (summary, chunk metadata), or None if there is too little to
+            summarize. The metadata only carries an 'embedding' when it was
+            approximated from the messages.
+        """
         messages = self.short_term.get_recent()
         
         if not messages or len(messages) < 2:
-            return
+            return None
         
         # Generate summary
         summary = self.summarizer.summarize(messages)
-        summary_embedding = self.preprocessor._generate_embedding(summary)
         
         # Extract metadata
         metadata = {
             'message_count': len(messages),
             'topics': self.summarizer.extract_key_topics(messages),
-            'embedding': summary_embedding,
         }
         
-        # Add to MTM
+        if self.approximate_summary_embedding:
+            embedding = self._mean_message_embedding(messages)
+            if embedding is not None:
+                metadata['embedding'] = embedding
+        
+        return summary, metadata
+    
+    @staticmethod
+    def _mean_message_embedding(messages: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Unit-normalized mean of the messages' embeddings (None if none has one)."""
+        vectors = [embedding for embedding in (msg.get('metadata', {}).get('embedding') for msg in messages)
+                   if embedding is not None and len(embedding) > 0]
+        if not vectors:
+            return None
+        mean = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+        norm = np.linalg.norm(mean)
+        return mean / norm if norm > 0 else None
+    
+    def _store_summary(self, summary: str, metadata: dict) -> None:
+        """Embed a summarized chunk (unless metadata already has one) and add it to MTM."""
+        if 'embedding' not in metadata:
+            metadata['embedding'] = self.preprocessor._generate_embedding(summary)
+        
+        # Near-duplicate summaries (e.g. repeated small talk) extend the
+        # existing chunk instead of growing MTM
+        if self.mtm_merge_threshold is not None:
+            duplicate = self.mid_term.find_near_duplicate(metadata['embedding'], self.mtm_merge_threshold)
+            if duplicate is not None:
+                self.mid_term.merge_chunk(duplicate, metadata)
+                logger.debug(f"Merged {metadata['message_count']} summarized messages into an existing MTM chunk")
+                return
+        
         self.mid_term.add_chunk(summary, metadata)
         
-        logger.debug(f"Summarized {len(messages)} messages to MTM")
+        logger.debug(f"Summarized {metadata['message_count']} messages to MTM")
     
     def _is_knowledge_worthy(self, role: str, content: str, metadata: dict) -> bool:
         """
@@ -357,23 +587,12 @@ class EnhancedMemoryOrchestrator:
         if role != 'assistant':
             return False
         
-        # Check for knowledge indicators
-        knowledge_keywords = [
-            'architecture', 'design', 'pattern',
-            'fix', 'solution', 'implement',
-            'guideline', 'best practice', 'recommendation',
-            'function', 'class', 'module',
-            'bug', 'error', 'issue'
-        ]
+        # Metadata flags are cheaper than scanning the text
+        if metadata.get('has_code', False) or metadata.get('importance', 'low') in ('high', 'critical'):
+            return True
         
         content_lower = content.lower()
-        has_keywords = any(kw in content_lower for kw in knowledge_keywords)
-        
-        # Check metadata
-        has_code = metadata.get('has_code', False)
-        is_important = metadata.get('importance', 'low') in ['high', 'critical']
-        
-        return has_keywords or has_code or is_important
+        return any(kw in content_lower for kw in _KNOWLEDGE_KEYWORDS)
     
     def _extract_to_ltm(self, role: str, content: str, metadata: dict) -> None:
         """Extract knowledge and add to LTM."""
@@ -381,16 +600,13 @@ class EnhancedMemoryOrchestrator:
             # Simple extraction for now
             # TODO: Use LLM to extract structured knowledge
             
-            # Determine category
+            # Determine category (first matching rule wins)
             content_lower = content.lower()
-            if 'function' in content_lower or 'method' in content_lower:
-                category = 'function'
-            elif 'architecture' in content_lower or 'design' in content_lower:
-                category = 'architecture'
-            elif 'bug' in content_lower or 'fix' in content_lower:
-                category = 'commit_log'
-            else:
-                category = 'guideline'
+            category = next(
+                (cat for cat, keywords in _LTM_CATEGORY_RULES
+                 if any(kw in content_lower for kw in keywords)),
+                'guideline'
+            )
             
             # Add to LTM
             if hasattr(self.long_term, 'add'):
@@ -414,12 +630,24 @@ class EnhancedMemoryOrchestrator:
         self.mid_term.clear()
         self.long_term.clear()
         self.message_count = 0
+        self._last_emit.clear()
+        self.close()
+    
+    @property
+    def short_term_count(self) -> int:
+        """Number of messages currently held in STM."""
+        return len(self.short_term.messages)
+    
+    @property
+    def mid_term_chunk_count(self) -> int:
+        """Number of summary chunks currently held in MTM."""
+        return len(self.mid_term.chunks)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics from all memory layers."""
         return {
-            'stm_count': len(self.short_term.get_recent(100)),
-            'mtm_count': len(self.mid_term.get_all()),
+            'stm_count': self.short_term_count,
+            'mtm_count': self.mid_term_chunk_count,
             'ltm_count': len(self.long_term.facts) if hasattr(self.long_term, 'facts') else 0,
             'message_count': self.message_count,
             'summarize_every': self.summarize_every,
@@ -105,7 +105,7 @@ class MemoryOrchestrator:
             )
         
         # Add to short-term memory
-        self.short_term.add(role, content, **metadata)
+        self.short_term.add(role, content, metadata)
         self.message_count += 1
         
         # Check if we need to summarize
@@ -74,7 +74,7 @@ class EnhancedMemoryOrchestrator:
         logger.info(f"✅ Enhanced orchestrator initialized with LTM integration")
         logger.info(f"   LTM strategy: {ltm_strategy}, top_k: {ltm_top_k}")
     
-    def add_message(self, role: str, content: str, **metadata) -> None:
+    def add_message(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
         """
         Add message and manage memory layers.
         
@@ -84,8 +84,10 @@ class EnhancedMemoryOrchestrator:
         3. Summarize STM → MTM
         4. Extract entities → LTM (if applicable)
         """
+        metadata = metadata or {}
+        
         # Add to STM
-        self.short_term.add(role, content, **metadata)
+        self.short_term.add(role, content, metadata)
         self.message_count += 1
         
         # Periodically summarize
@@ -215,7 +217,7 @@ class EnhancedMemoryOrchestrator:
             (stm_context, mtm_context, ltm_context)
         """
         # Retrieve from STM
-        if use_embedding_search and query_embedding:
+        if use_embedding_search and query_embedding is not None:
             stm_context = self.short_term.search_by_embedding(
                 query_embedding,
                 top_k=n_recent or 5
@@ -224,7 +226,7 @@ class EnhancedMemoryOrchestrator:
             stm_context = self.short_term.get_recent(n_recent)
         
         # Retrieve from MTM
-        if use_embedding_search and query_embedding:
+        if use_embedding_search and query_embedding is not None:
             mtm_context = self.mid_term.search_by_embedding(
                 query_embedding,
                 top_k=n_chunks or 3
@@ -262,7 +264,7 @@ class EnhancedMemoryOrchestrator:
                 return self._retrieve_from_hybrid_ltm(query, query_embedding)
             
             # Fallback to simple retrieval
-            if use_embedding_search and query_embedding:
+            if use_embedding_search and query_embedding is not None:
                 # Simple embedding search
                 if hasattr(self.long_term, 'search_by_embedding'):
                     return self.long_term.search_by_embedding(
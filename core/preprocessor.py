@@ -1,8 +1,64 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
 import re
+import threading
 import numpy as np
 from datetime import datetime
 
+# Optional SIMD kernels for cosine similarity (falls back to NumPy)
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+# Special characters removed by _normalize_text (everything except word
+# characters, whitespace and ? ! . _ -): a translate table covers ASCII text,
+# the compiled pattern everything else
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\?\!\.\_\-]')
+_ASCII_SPECIAL_CHARS = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128))
+    if not (c.isalnum() or c.isspace() or c in '?!._-')
+))
+
+
+def _unit_vectors(embeddings) -> np.ndarray:
+    """L2-normalize embedding rows (as float32) so cosine similarity is a plain dot product."""
+    matrix = np.array(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0  # zero vectors stay zero
+    matrix /= norms
+    return matrix
+
+
+# PCG64 stream increment shared by every mock embedding (any odd value works)
+_MOCK_RNG_INC = 1442695040888963407
+
+# One generator per thread, reset per text: constructing a fresh bit
+# generator costs more than drawing the vector itself
+_rng_local = threading.local()
+
+
+def _text_rng(text: str) -> np.random.Generator:
+    """
+    Thread-local generator reset to a state derived from the text.
+    
+    Seeded with blake2b, so it is stable across processes (unlike hash())
+    and never touches the global NumPy RNG.
+    """
+    rng = getattr(_rng_local, 'rng', None)
+    if rng is None:
+        rng = _rng_local.rng = np.random.Generator(np.random.PCG64())
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    rng.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(digest, 'little'), 'inc': _MOCK_RNG_INC},
+        'has_uint32': 0,
+        'uinteger': 0,
+    }
+    return rng
+
+
 class InputPreprocessor:
     """
     Preprocesses user input and creates structured query objects.
@@ -13,7 +69,8 @@ class InputPreprocessor:
     - Embedding generation (mock or real)
     """
     
-    def __init__(self, embedding_dim: int = 384, use_mock_embeddings: bool = True, embedding_model: Optional[Any] = None):
+    def __init__(self, embedding_dim: int = 384, use_mock_embeddings: bool = True, embedding_model: Optional[Any] = None,
+                 cache_size: int = 512):
         """
         Initialize input preprocessor.
         
@@ -21,6 +78,7 @@ class InputPreprocessor:
             embedding_dim: Dimension of embedding vectors
             use_mock_embeddings: Use mock embeddings or real model
             embedding_model: Optional pre-initialized embedding model (RealEmbeddingGenerator)
+            cache_size: Raw texts whose analysis and embedding preprocess() memoizes
         """
         self.embedding_dim = embedding_dim
         self.use_mock_embeddings = use_mock_embeddings
@@ -29,11 +87,9 @@ class InputPreprocessor:
         # Initialize embedding generator if not using mock and no model provided
         if not use_mock_embeddings and embedding_model is None:
             try:
-                from utils.real_embedding import RealEmbeddingGenerator
-                print("🔄 Initializing RealEmbeddingGenerator for InputPreprocessor...")
-                self.embedding_model = RealEmbeddingGenerator()
+                from utils.real_embedding import get_shared_embedder
+                self.embedding_model = get_shared_embedder()
                 self.embedding_dim = self.embedding_model.embedding_dim
-                print(f"✅ Embedding model ready! Dimension: {self.embedding_dim}")
             except Exception as e:
                 print(f"⚠️  Failed to load real embeddings: {e}")
                 print("   Falling back to mock embeddings")
@@ -47,40 +103,87 @@ class InputPreprocessor:
             'commit_log': ['commit', 'history', 'changelog', 'git log', 'version'],
             'general': []  # fallback
         }
+        # (keyword, intent) pairs in priority order, flattened once for _detect_intent
+        self._intent_table = tuple(
+            (keyword, intent)
+            for intent, keywords in self.intent_keywords.items()
+            for keyword in keywords
+        )
+        
+        # Repeated inputs skip normalization/intent/keywords and the embedding
+        # model: raw text -> [normalized text, intent, keywords, embedding or None].
+        # A plain dict rather than lru_cache on bound methods, so the cache
+        # holds no reference back to self
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, list]' = OrderedDict()
     
-    def preprocess(self, raw_text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def preprocess(self,
+                   raw_text: str,
+                   metadata: Optional[Dict[str, Any]] = None,
+                   with_embedding: bool = True) -> Dict[str, Any]:
         """
         Preprocess user input into structured query object.
         
         Args:
             raw_text: Raw user input
             metadata: Optional metadata (file context, etc.)
+            with_embedding: Generate the embedding (None when disabled)
             
         Returns:
             Structured query object with embedding and intent
         """
-        # Normalize text
-        normalized_text = self._normalize_text(raw_text)
-        
-        # Detect intent
-        intent = self._detect_intent(normalized_text)
-        
-        # Generate embedding
-        embedding = self._generate_embedding(normalized_text)
+        # Normalize text, detect intent, extract keywords (memoized)
+        entry = self._cache.get(raw_text)
+        if entry is None:
+            entry = [*self._analyze_text(raw_text), None]
+            self._cache[raw_text] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(raw_text)
+        normalized_text, intent, keywords, embedding = entry
         
-        # Extract keywords
-        keywords = self._extract_keywords(normalized_text)
+        # Generate embedding on first use (skipped when the caller won't use it)
+        if with_embedding and embedding is None:
+            embedding = entry[3] = self._readonly_embedding(normalized_text)
+        elif not with_embedding:
+            embedding = None
         
         return {
             'raw_text': raw_text,
             'normalized_text': normalized_text,
             'embedding': embedding,
             'intent': intent,
-            'keywords': keywords,
+            'keywords': list(keywords),
             'metadata': metadata or {},
             'timestamp': datetime.utcnow().isoformat(),
         }
     
+    def clear_cache(self) -> None:
+        """Drop every memoized analysis and embedding."""
+        self._cache.clear()
+    
+    def _analyze_text(self, raw_text: str) -> Tuple[str, str, Tuple[str, ...]]:
+        """
+        Text-only part of preprocess.
+        
+        Returns:
+            (normalized text, intent, keywords)
+        """
+        normalized_text = self._normalize_text(raw_text)
+        return normalized_text, self._detect_intent(normalized_text), tuple(self._extract_keywords(normalized_text))
+    
+    def _readonly_embedding(self, normalized_text: str) -> np.ndarray:
+        """
+        Embed normalized text for preprocess.
+        
+        Returns:
+            Read-only embedding, since cached arrays are shared between results
+        """
+        embedding = self._generate_embedding(normalized_text)
+        embedding.setflags(write=False)
+        return embedding
+    
     def _normalize_text(self, text: str) -> str:
         """
         Normalize text: lowercase, remove extra whitespace, clean special chars.
@@ -91,14 +194,14 @@ class InputPreprocessor:
         Returns:
             Normalized text
         """
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Lowercase and collapse whitespace runs to single spaces
+        text = ' '.join(text.lower().split())
         
         # Remove some special characters (keep important ones like ?, !)
-        text = re.sub(r'[^\w\s\?\!\.\_\-]', '', text)
+        if text.isascii():
+            text = text.translate(_ASCII_SPECIAL_CHARS)
+        else:
+            text = _SPECIAL_CHARS_RE.sub('', text)
         
         return text.strip()
     
@@ -114,17 +217,14 @@ class InputPreprocessor:
         """
         text_lower = text.lower()
         
-        # Check each intent category
-        for intent, keywords in self.intent_keywords.items():
-            if intent == 'general':
-                continue
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return intent
+        # First keyword hit wins, in category order; 'general' has no keywords
+        for keyword, intent in self._intent_table:
+            if keyword in text_lower:
+                return intent
         
         return 'general'
     
-    def _generate_embedding(self, text: str) -> List[float]:
+    def _generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding vector for text.
         
@@ -132,7 +232,7 @@ class InputPreprocessor:
             text: Normalized text
             
         Returns:
-            Embedding vector
+            Unit-length float32 embedding vector
         """
         if self.use_mock_embeddings:
             return self._mock_embedding(text)
@@ -140,32 +240,52 @@ class InputPreprocessor:
             # Use real embedding model
             if self.embedding_model:
                 try:
-                    return self.embedding_model.generate(text)
+                    return _unit_vectors(self.embedding_model.generate(text))
                 except Exception as e:
                     print(f"⚠️  Embedding generation failed: {e}, using mock")
                     return self._mock_embedding(text)
             else:
                 return self._mock_embedding(text)
     
-    def _mock_embedding(self, text: str) -> List[float]:
+    def _mock_embedding(self, text: str) -> np.ndarray:
         """
-        Generate mock embedding using simple hash + random.
+        Generate mock embedding from a text-seeded Gaussian.
         
         Args:
             text: Text to embed
             
         Returns:
-            Mock embedding vector
+            Unit-length float32 mock embedding vector
         """
-        # Use hash for reproducibility
-        seed = hash(text) % (2**32)
-        np.random.seed(seed)
+        # Text-seeded generator: reproducible, and leaves the global NumPy RNG alone
+        embedding = _text_rng(text).standard_normal(self.embedding_dim, dtype=np.float32)
+        embedding /= np.linalg.norm(embedding)
         
-        # Generate random vector and normalize
-        embedding = np.random.randn(self.embedding_dim)
-        embedding = embedding / np.linalg.norm(embedding)
+        return embedding
+    
+    @staticmethod
+    def quantize(embedding: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantize embeddings to int8 with one scale per vector.
+        
+        Each vector's largest magnitude maps to 127; `codes * scale`
+        approximately restores it. MidTermMemory's int8 index quantizes its
+        chunks and queries with this.
         
-        return embedding.tolist()
+        Args:
+            embedding: Embedding vector, or (N, dim) matrix of vectors
+            
+        Returns:
+            (int8 codes, float32 scale per vector)
+        """
+        vectors = np.atleast_2d(np.asarray(embedding, dtype=np.float32))
+        scales = np.abs(vectors).max(axis=1, initial=0.0) / 127
+        scales[scales == 0] = 1.0  # zero vectors stay zero
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        
+        if np.ndim(embedding) == 1:
+            return codes[0], scales[0]
+        return codes, scales
     
     def _extract_keywords(self, text: str) -> List[str]:
         """
@@ -202,11 +322,16 @@ class InputPreprocessor:
         Returns:
             Similarity score (0 to 1)
         """
-        vec1 = np.array(embedding1)
-        vec2 = np.array(embedding2)
-        
-        # Cosine similarity
-        similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+        if simsimd is not None:
+            # SimSIMD returns cosine distance
+            similarity = 1.0 - simsimd.cosine(np.asarray(embedding1, dtype=np.float32),
+                                              np.asarray(embedding2, dtype=np.float32))
+        else:
+            vec1 = np.asarray(embedding1)
+            vec2 = np.asarray(embedding2)
+            
+            # Cosine similarity
+            similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
         
         # Normalize to 0-1 range
         return float((similarity + 1) / 2)
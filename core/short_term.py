@@ -1,8 +1,18 @@
-from typing import List, Dict, Any, Optional
+from typing import Deque, List, Dict, Any, Optional
+from collections import deque
 from datetime import datetime, timedelta
+from itertools import islice
+import heapq
 import json
 import numpy as np
 
+
+def _message_embedding(message: Dict[str, Any]):
+    """A message's stored embedding (list or ndarray), or None if it has none."""
+    embedding = message.get('metadata', {}).get('embedding')
+    return embedding if embedding is not None and len(embedding) > 0 else None
+
+
 class ShortTermMemory:
     """
     Manages short-term memory for the chatbot.
@@ -20,25 +30,28 @@ class ShortTermMemory:
         """
         self.max_size = max_size
         self.ttl = timedelta(seconds=ttl_seconds)
-        self.messages: List[Dict[str, Any]] = []
+        # Bounded ring buffer: appending at capacity drops the oldest message
+        self.messages: Deque[Dict[str, Any]] = deque(maxlen=max_size)
     
-    def add(self, role: str, content: str, **metadata) -> None:
+    def add(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
         """
         Add a new message to short-term memory.
         
         Args:
             role: 'user' or 'assistant'
             content: The message content
-            **metadata: Additional metadata to store with the message
+            metadata: Additional metadata to store with the message (e.g. 'embedding')
         """
         message = {
             'role': role,
             'content': content,
             'timestamp': datetime.utcnow().isoformat(),
         }
+        if metadata:
+            # Copy, so later changes to the caller's dict don't leak into history
+            message['metadata'] = dict(metadata)
         
         self.messages.append(message)
-        self._enforce_limits()
     
     def get_recent(self, n: Optional[int] = None, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
@@ -53,41 +66,47 @@ class ShortTermMemory:
         """
         if query_embedding is not None:
             # Semantic search: rank by similarity
+            embedded = [msg for msg in self.messages if _message_embedding(msg) is not None]
+            similarities = self._similarities(query_embedding, [msg['metadata']['embedding'] for msg in embedded])
             messages_with_scores = []
-            for msg in self.messages:
-                msg_embedding = msg.get('embedding', [])
-                if msg_embedding:
-                    similarity = self._cosine_similarity(query_embedding, msg_embedding)
-                    msg_copy = msg.copy()
-                    msg_copy['similarity'] = similarity
-                    messages_with_scores.append(msg_copy)
-            
-            # Sort by similarity
-            messages_with_scores.sort(key=lambda x: x['similarity'], reverse=True)
+            for msg, similarity in zip(embedded, similarities):
+                msg_copy = msg.copy()
+                msg_copy['similarity'] = similarity
+                messages_with_scores.append(msg_copy)
             
             if n is None:
+                # Sort by similarity
+                messages_with_scores.sort(key=lambda x: x['similarity'], reverse=True)
                 return messages_with_scores
-            return messages_with_scores[:n] if n > 0 else []
+            # Bounded heap for the n best instead of a full sort
+            return heapq.nlargest(n, messages_with_scores, key=lambda x: x['similarity']) if n > 0 else []
         else:
             # Time-based: most recent
             if n is None:
-                return self.messages.copy()
-            return self.messages[-n:] if n > 0 else []
+                return list(self.messages)
+            return list(islice(self.messages, max(0, len(self.messages) - n), None)) if n > 0 else []
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        import numpy as np
-        arr1 = np.array(vec1)
-        arr2 = np.array(vec2)
-        
-        dot_product = np.dot(arr1, arr2)
-        norm1 = np.linalg.norm(arr1)
-        norm2 = np.linalg.norm(arr2)
+    def _similarities(self, query_embedding, embeddings: List[List[float]]) -> List[float]:
+        """
+        Cosine similarity of the query against each embedding.
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+        The query is converted once and all embeddings are scored with one
+        matrix-vector product; zero vectors score 0.
         
-        return float(dot_product / (norm1 * norm2))
+        Args:
+            query_embedding: Query embedding (list or np.ndarray)
+            embeddings: Embeddings to score
+            
+        Returns:
+            Similarities in input order
+        """
+        if not embeddings:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float64)
+        matrix = np.asarray(embeddings, dtype=np.float64)
+        denominators = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        dots = matrix @ query
+        return np.divide(dots, denominators, out=np.zeros_like(dots), where=denominators != 0).tolist()
     
     def search_by_embedding(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -106,36 +125,17 @@ class ShortTermMemory:
             return []
         
         # Calculate similarities
-        results = []
-        for msg in self.messages:
-            if 'embedding' in msg.get('metadata', {}):
-                msg_embedding = msg['metadata']['embedding']
-                similarity = self._cosine_similarity(query_embedding, msg_embedding)
-                results.append({
-                    'message': msg,
-                    'similarity': similarity
-                })
-        
-        # Sort by similarity
-        results.sort(key=lambda x: x['similarity'], reverse=True)
+        embedded = [msg for msg in self.messages if _message_embedding(msg) is not None]
+        similarities = self._similarities(query_embedding, [msg['metadata']['embedding'] for msg in embedded])
+        results = [{'message': msg, 'similarity': similarity}
+                   for msg, similarity in zip(embedded, similarities)]
         
-        # Return top-k messages
-        return [r['message'] for r in results[:top_k]]
-    
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        v1 = np.array(vec1)
-        v2 = np.array(vec2)
-        return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
+        # Return top-k messages (bounded heap instead of a full sort)
+        return [r['message'] for r in heapq.nlargest(top_k, results, key=lambda x: x['similarity'])]
     
     def clear(self) -> None:
         """Clear all messages from short-term memory."""
-        self.messages = []
-    
-    def _enforce_limits(self) -> None:
-        """Ensure memory doesn't exceed max_size."""
-        while len(self.messages) > self.max_size:
-            self.messages.pop(0)
+        self.messages.clear()
     
     def _clean_expired(self) -> None:
         """Remove messages that have exceeded their TTL."""
@@ -143,19 +143,28 @@ class ShortTermMemory:
             return
             
         now = datetime.utcnow()
-        self.messages = [
-            msg for msg in self.messages
-            if now - datetime.fromisoformat(msg['timestamp']) < self.ttl
-        ]
+        self.messages = deque(
+            (msg for msg in self.messages
+             if now - datetime.fromisoformat(msg['timestamp']) < self.ttl),
+            maxlen=self.max_size
+        )
     
     def to_dict(self) -> Dict[str, Any]:
         """Serialize memory to a dictionary."""
         return {
-            'messages': self.messages,
+            'messages': [self._serializable(msg) for msg in self.messages],
             'max_size': self.max_size,
             'ttl_seconds': self.ttl.total_seconds() if self.ttl else None,
         }
     
+    @staticmethod
+    def _serializable(message: Dict[str, Any]) -> Dict[str, Any]:
+        """The message, with an ndarray embedding copied out as a list for JSON."""
+        embedding = message.get('metadata', {}).get('embedding')
+        if isinstance(embedding, np.ndarray):
+            message = {**message, 'metadata': {**message['metadata'], 'embedding': embedding.tolist()}}
+        return message
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ShortTermMemory':
         """Deserialize memory from a dictionary."""
@@ -163,5 +172,5 @@ class ShortTermMemory:
             max_size=data.get('max_size', 10),
             ttl_seconds=data.get('ttl_seconds', 3600)
         )
-        instance.messages = data.get('messages', [])
+        instance.messages.extend(data.get('messages', []))
         return instance
@@ -101,13 +101,11 @@ class Summarizer:
         Returns:
             List of key topics/keywords
         """
-        # Simple keyword extraction (can be enhanced with NLP)
-        topics = set()
+        # Simple keyword extraction (can be enhanced with NLP); lowercase and
+        # split all messages in one pass
+        text = ' '.join(msg.get('content', '') for msg in messages).lower()
         
-        for msg in messages:
-            content = msg.get('content', '').lower()
-            # Extract words longer than 5 characters as potential topics
-            words = [w.strip('.,!?;:') for w in content.split()]
-            topics.update([w for w in words if len(w) > 5])
+        # Extract words longer than 5 characters as potential topics
+        topics = {w for w in (w.strip('.,!?;:') for w in text.split()) if len(w) > 5}
         
         return list(topics)[:10]  # Return top 10
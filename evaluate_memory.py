@@ -16,7 +16,7 @@ import json
 import time
 import os
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from core.short_term import ShortTermMemory
 from core.mid_term import MidTermMemory
 from core.long_term import LongTermMemory
@@ -82,8 +82,7 @@ class MemoryEvaluator:
             self.stm.add(
                 msg['role'],
                 msg['content'],
-                embedding=msg['metadata'].get('embedding'),
-                **{k: v for k, v in msg['metadata'].items() if k != 'embedding'}
+                msg['metadata']
             )
         
         # Load MTM
@@ -105,14 +104,14 @@ class MemoryEvaluator:
         """Evaluate retrieval quality for a query."""
         # Generate embedding
         try:
-            from utils.real_embedding import RealEmbeddingGenerator
-            embedder = RealEmbeddingGenerator()
+            from utils.real_embedding import get_shared_embedder
+            embedder = get_shared_embedder()
             query_emb = embedder.generate(query)
         except:
             import hashlib, random
             h = int(hashlib.md5(query.encode()).hexdigest(), 16)
-            random.seed(h)
-            query_emb = [random.random() for _ in range(384)]
+            rng = random.Random(h)
+            query_emb = [rng.random() for _ in range(384)]
         
         # Retrieve from each layer
         start_time = time.time()
@@ -222,8 +221,13 @@ class MemoryEvaluator:
             }
         }
     
-    def run_full_evaluation(self) -> Dict[str, Any]:
-        """Run complete evaluation suite."""
+    def run_full_evaluation(self, save: bool = True) -> Dict[str, Any]:
+        """
+        Run complete evaluation suite.
+        
+        Args:
+            save: Write the results to a timestamped JSON report
+        """
         print("╔" + "="*78 + "╗")
         print("║" + " "*25 + "MEMORY EVALUATION" + " "*36 + "║")
         print("╚" + "="*78 + "╝")
@@ -313,14 +317,30 @@ class MemoryEvaluator:
         print(f"Grade:             {grade}")
         print("="*80)
         
-        # Save report
-        report_file = f"evaluation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        if save:
+            self.save_report(results)
+        
+        return results
+    
+    @staticmethod
+    def save_report(results: Dict[str, Any], report_file: Optional[str] = None) -> str:
+        """
+        Write evaluation results to a JSON report.
+        
+        Args:
+            results: Results from run_full_evaluation
+            report_file: Output path (default: timestamped evaluation_report_*.json)
+            
+        Returns:
+            Path of the written report
+        """
+        if report_file is None:
+            report_file = f"evaluation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         with open(report_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, ensure_ascii=False, indent=2)
         
         print(f"\n💾 Report saved: {report_file}")
-        
-        return results
+        return report_file
 
 
 def main():
@@ -25,8 +25,8 @@ except:
         def generate(self, text):
             import hashlib, random
             h = int(hashlib.md5(text.encode()).hexdigest(), 16)
-            random.seed(h)
-            return [random.random() for _ in range(384)]
+            rng = random.Random(h)
+            return [rng.random() for _ in range(384)]
     embedder = MockEmbedder()
 
 print(f"📊 Embedding: {'Real' if USE_REAL else 'Mock'}")
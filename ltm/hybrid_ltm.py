@@ -317,15 +317,15 @@ class HybridLTM:
         
         # Generate new embedding
         try:
-            from utils.real_embedding import RealEmbeddingGenerator
-            embedder = RealEmbeddingGenerator()
+            from utils.real_embedding import get_shared_embedder
+            embedder = get_shared_embedder()
             embedding = embedder.generate(text)
         except:
             # Fallback to mock
             import hashlib, random
             h = int(hashlib.md5(text.encode()).hexdigest(), 16)
-            random.seed(h)
-            embedding = [random.random() for _ in range(384)]
+            rng = random.Random(h)
+            embedding = [rng.random() for _ in range(384)]
         
         # Cache
         self._embedding_cache[text] = embedding
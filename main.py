@@ -31,7 +31,8 @@ def create_chatbot(config: dict, use_advanced_workflow: bool = True) -> ChatBot:
     )
     
     mid_term = MidTermMemory(
-        max_size=config['memory']['mid_term']['max_size']
+        max_size=config['memory']['mid_term']['max_size'],
+        quantize_embeddings=config['memory']['mid_term'].get('quantize_embeddings', False)
     )
     
     long_term = LongTermMemory(
@@ -53,7 +54,9 @@ def create_chatbot(config: dict, use_advanced_workflow: bool = True) -> ChatBot:
         preprocessor=preprocessor,
         aggregator=aggregator,
         compressor=compressor,
-        summarize_every=config['memory']['mid_term']['summarize_every']
+        summarize_every=config['memory']['mid_term']['summarize_every'],
+        approximate_summary_embedding=config['memory']['mid_term'].get('approximate_summary_embedding', False),
+        mtm_merge_threshold=config['memory']['mid_term'].get('merge_threshold')
     )
     
     # Initialize response components
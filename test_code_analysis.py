@@ -70,8 +70,7 @@ class CodeAnalysisTest:
                 self.stm.add(
                     msg['role'],
                     msg['content'],
-                    embedding=msg['metadata'].get('embedding'),
-                    **{k: v for k, v in msg['metadata'].items() if k != 'embedding'}
+                    msg['metadata']
                 )
             print(f"   ✅ Loaded {len(stm_data)} STM messages")
         except FileNotFoundError:
@@ -116,16 +115,16 @@ class CodeAnalysisTest:
         
         # Generate embedding for query
         try:
-            from utils.real_embedding import RealEmbeddingGenerator
-            embedder = RealEmbeddingGenerator()
+            from utils.real_embedding import get_shared_embedder
+            embedder = get_shared_embedder()
             query_embedding = embedder.generate(query)
         except:
             # Mock embedding
             import hashlib
             import random
             hash_val = int(hashlib.md5(query.encode()).hexdigest(), 16)
-            random.seed(hash_val)
-            query_embedding = [random.random() for _ in range(384)]
+            rng = random.Random(hash_val)
+            query_embedding = [rng.random() for _ in range(384)]
         
         # Search STM
         start_time = time.time()
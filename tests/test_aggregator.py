@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for MemoryAggregator deduplication.
+"""
+
+import random
+from core.aggregator import MemoryAggregator, _tokenize, _jaccard
+
+THRESHOLDS = (0.0, 0.3, 0.5, 0.75, 0.8, 0.95, 1.0)
+VOCABULARY = ['cache', 'Cache!', 'memory', 'layer', 'graph', 'python', 'fix', 'bug', 'design', 'query']
+
+
+def _brute_force_dedupe(items, threshold):
+    """Reference: keep an item unless its Jaccard with a kept item exceeds threshold."""
+    kept, kept_tokens = [], []
+    for item in items:
+        tokens = _tokenize(item['content'])
+        if not any(tokens and seen and _jaccard(tokens, seen) > threshold for seen in kept_tokens):
+            kept.append(item)
+            kept_tokens.append(tokens)
+    return kept
+
+
+def _random_items(rng, n):
+    items = []
+    for _ in range(n):
+        words = rng.sample(VOCABULARY, rng.randint(0, 7))
+        items.append({'content': ' '.join(words) if words else rng.choice(['', '  ', '?!'])})
+    return items
+
+
+def test_deduplicate_matches_brute_force_jaccard():
+    """Prefix index and fingerprint/size bounds never change which items are kept."""
+    aggregator = MemoryAggregator()
+    rng = random.Random(1234)
+    for _ in range(300):
+        items = _random_items(rng, rng.randint(0, 25))
+        for threshold in THRESHOLDS:
+            assert aggregator._deduplicate(items, threshold) == _brute_force_dedupe(items, threshold)
+
+
+def test_deduplicate_edge_cases():
+    """Empty token sets are never duplicates; threshold 1.0 keeps everything."""
+    aggregator = MemoryAggregator()
+    empties = [{'content': ''}, {'content': '...'}, {'content': '   '}]
+    assert aggregator._deduplicate(empties, 0.95) == empties
+
+    same = [{'content': 'python memory layer'}, {'content': 'Python, memory layer!'}]
+    assert aggregator._deduplicate(same, 1.0) == same
+    assert aggregator._deduplicate(same, 0.95) == same[:1]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for ContextCompressor MMR selection.
+"""
+
+from core.compressor import ContextCompressor
+
+
+def _item(content, score, source='mid_term'):
+    return {'content': content, 'source': source, 'metadata': {}, 'final_score': score}
+
+
+def _fixture():
+    return {'items': [
+        _item("python memory layer cache", 0.9),
+        _item("Python memory layer cache!", 0.85),  # same tokens once punctuation/case are dropped
+        _item("graph database neo4j", 0.55),
+    ]}
+
+
+def test_mmr_prefers_diverse_item_over_near_duplicate():
+    """After the top item, a distinct lower-scored item beats a reworded duplicate."""
+    compressor = ContextCompressor(max_tokens=2000, strategy='mmr')
+
+    kept = compressor.compress(_fixture())['compressed_items']
+
+    assert [i['content'] for i in kept] == [
+        "python memory layer cache",
+        "graph database neo4j",
+        "Python memory layer cache!",
+    ]
+
+
+def test_mmr_with_full_relevance_weight_keeps_score_order():
+    """lambda_param=1 ignores diversity, so selection follows final_score."""
+    compressor = ContextCompressor(max_tokens=2000, strategy='mmr')
+    items = _fixture()['items']
+    for item in items:
+        item['token_count'] = compressor._estimate_tokens(item['content'])
+
+    kept = compressor._mmr_compress(items, lambda_param=1.0)
+
+    assert [i['final_score'] for i in kept] == [0.9, 0.85, 0.55]
+
+
+def test_compress_leaves_caller_items_untouched():
+    """Token counts live on the compressor's own copies, not the input dicts."""
+    compressor = ContextCompressor(max_tokens=6, strategy='truncate')
+    context = _fixture()
+
+    result = compressor.compress(context)
+
+    assert all('token_count' not in item for item in context['items'])
+    assert [i['content'] for i in result['compressed_items']] == ["python memory layer cache"]
+
+
+def test_mmr_keeps_recent_stm_first_within_budget():
+    """Recent STM items are kept ahead of the MMR pool."""
+    compressor = ContextCompressor(max_tokens=2000, strategy='mmr')
+    context = _fixture()
+    context['items'].append(_item("latest user message", 0.1, source='short_term'))
+
+    kept = compressor.compress(context)['compressed_items']
+
+    assert kept[0]['content'] == "latest user message"
+    assert len(kept) == 4
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for MidTermMemory search and near-duplicate merging.
+"""
+
+import json
+import numpy as np
+from core.mid_term import MidTermMemory
+
+
+
+def test_find_near_duplicate_respects_threshold():
+    """Only a chunk whose cosine similarity exceeds the threshold is returned."""
+    mtm = MidTermMemory()
+    mtm.add_chunk("x axis", {'embedding': np.array([1.0, 0.0])})
+    mtm.add_chunk("y axis", {'embedding': np.array([0.0, 1.0])})
+
+    close = np.array([1.0, 0.1])  # cosine ~0.995 with "x axis"
+    assert mtm.find_near_duplicate(close, threshold=0.95)['summary'] == "x axis"
+    assert mtm.find_near_duplicate(close, threshold=0.999) is None
+    assert MidTermMemory().find_near_duplicate(close) is None
+
+
+def test_merge_chunk_sums_counts_and_keeps_summary():
+    """Merging folds message counts and topics in without touching summary or index."""
+    mtm = MidTermMemory()
+    mtm.add_chunk("greeting", {'message_count': 5, 'topics': ['hello'], 'embedding': np.array([1.0, 0.0])})
+    chunk = mtm.find_near_duplicate(np.array([1.0, 0.0]))
+
+    mtm.merge_chunk(chunk, {'message_count': 3, 'topics': ['hello', 'thanks']})
+
+    assert len(mtm.chunks) == 1
+    assert chunk['summary'] == "greeting"
+    assert chunk['metadata']['message_count'] == 8
+    assert chunk['metadata']['topics'] == ['hello', 'thanks']
+    assert mtm.search_by_embedding(np.array([1.0, 0.0]), top_k=1)[0]['summary'] == "greeting"
+
+def test_merge_chunk_keeps_to_dict_json_serializable():
+    """Merged topics stay a capped list, so to_dict() still round-trips through JSON."""
+    mtm = MidTermMemory()
+    embedding = np.ones(8, dtype=np.float32)
+    mtm.add_chunk("first summary", {'message_count': 5, 'topics': ['alpha', 'beta'], 'embedding': embedding})
+
+    duplicate = mtm.find_near_duplicate(embedding)
+    assert duplicate is not None
+    mtm.merge_chunk(duplicate, {'message_count': 5, 'topics': ['beta'] + [f'topic{i}' for i in range(12)]})
+
+    metadata = mtm.chunks[0]['metadata']
+    assert metadata['message_count'] == 10
+    assert metadata['topics'][:3] == ['alpha', 'beta', 'topic0']
+    assert len(metadata['topics']) == 10
+
+    restored = json.loads(json.dumps(mtm.to_dict()))
+    assert restored['chunks'][0]['metadata']['topics'] == metadata['topics']
+
+
+def test_zero_query_scores_zero():
+    """A zero query vector gives 0 relevance (no NaN) in both index modes."""
+    for quantize in (False, True):
+        mtm = MidTermMemory(quantize_embeddings=quantize)
+        mtm.add_chunk("a", {'embedding': np.array([1.0, 0.0, 0.0])})
+        mtm.add_chunk("b", {'embedding': np.array([0.0, 1.0, 0.0])})
+
+        results = mtm.search_by_embedding(np.zeros(3), top_k=2)
+
+        assert [r['relevance_score'] for r in results] == [0.0, 0.0]
+        assert [r['summary'] for r in results] == ["a", "b"]
+        assert mtm.find_near_duplicate(np.zeros(3)) is None
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the orchestrator's cache-stable context and delta emission.
+"""
+
+import pytest
+from core import orchestrator as orchestrator_module
+from core.orchestrator import EnhancedMemoryOrchestrator
+from core.short_term import ShortTermMemory
+from core.mid_term import MidTermMemory
+from core.long_term import LongTermMemory
+from core.summarizer import Summarizer
+from core.compressor import ContextCompressor
+
+
+def _orchestrator(n_messages=12, **kwargs):
+    long_term = LongTermMemory(enabled=True)
+    long_term.add('cache', "The cache uses an LRU pattern for hot keys")
+    long_term.add('config', "Configuration is loaded in config.py")
+    orchestrator = EnhancedMemoryOrchestrator(ShortTermMemory(), MidTermMemory(), long_term, Summarizer(), **kwargs)
+    for i in range(n_messages):
+        role = 'user' if i % 2 == 0 else 'assistant'
+        orchestrator.add_message(role, f"message {i} about {'python memory' if i % 3 else 'graph databases'}")
+    return orchestrator
+
+
+def test_prefix_hash_does_not_depend_on_query():
+    """With memory unchanged, different queries share the same prefix."""
+    orchestrator = _orchestrator()
+
+    first = orchestrator.get_context_pack("python memory")
+    second = orchestrator.get_context_pack("graph databases")
+
+    assert first['prefix_hash'] == second['prefix_hash']
+    assert first['prefix'] == second['prefix']
+    assert "The cache uses an LRU pattern for hot keys" in first['prefix']
+    assert first['text'].startswith(first['prefix'])
+
+
+def test_prefix_hash_changes_when_memory_changes():
+    """A new MTM chunk changes the prefix."""
+    orchestrator = _orchestrator()
+    before = orchestrator.get_context_pack("python memory")['prefix_hash']
+
+    for i in range(orchestrator.summarize_every):
+        orchestrator.add_message('user', f"new topic {i}")
+
+    assert orchestrator.get_context_pack("python memory")['prefix_hash'] != before
+
+
+def test_prefix_is_capped_to_compressor_budget():
+    """Prefix lines are taken in their fixed order until the token budget is hit."""
+    # The cache fact alone is 10 tokens; the config fact and MTM chunks do not fit
+    orchestrator = _orchestrator(compressor=ContextCompressor(max_tokens=10))
+
+    prefix = orchestrator.get_context_pack("python memory")['prefix']
+    assert "The cache uses an LRU pattern for hot keys" in prefix
+    assert "Configuration is loaded in config.py" not in prefix
+    assert "[Previous Context]" not in prefix
+
+    uncapped = orchestrator.get_context_pack("python memory", use_compression=False)['prefix']
+    assert "Configuration is loaded in config.py" in uncapped
+    assert "[Previous Context]" in uncapped
+
+
+def test_suffix_is_stm_tail_then_query():
+    """The suffix skips STM lines already in the prefix and ends with the query."""
+    orchestrator = _orchestrator()
+    orchestrator.add_message('user', "Configuration is loaded in config.py")
+    orchestrator.add_message('assistant', "noted")
+
+    pack = orchestrator.get_context_pack("where is the config?")
+
+    assert "Configuration is loaded in config.py" in pack['prefix']
+    assert "Configuration is loaded in config.py" not in pack['suffix']
+    assert "- noted" in pack['suffix']
+    assert pack['suffix'].endswith("[Current Query]\nwhere is the config?")
+    assert pack['text'] == pack['prefix'] + pack['suffix']
+
+
+def test_close_shuts_down_ltm_worker():
+    """close() and clear_all() stop the lazily created LTM thread pool."""
+    orchestrator = _orchestrator(n_messages=0)
+    pool = orchestrator._ltm_executor()
+    assert pool.submit(lambda: 42).result() == 42
+
+    orchestrator.clear_all()
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: 42)
+
+    with orchestrator:
+        pool = orchestrator._ltm_executor()
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: 42)
+
+    # A fresh worker is created on next use
+    assert orchestrator._ltm_executor().submit(lambda: 7).result() == 7
+    orchestrator.close()
+
+
+def test_context_delta_per_session():
+    """First call emits everything; an unchanged prefix then emits only the suffix."""
+    orchestrator = _orchestrator()
+
+    first = orchestrator.get_context_delta('a')
+    assert not first['cached']
+    assert first['delta'] == first['text']
+
+    orchestrator.add_message('user', "one more question")
+    second = orchestrator.get_context_delta('a')
+    assert second['cached']
+    assert second['prefix_hash'] == first['prefix_hash']
+    assert second['text'].endswith(second['delta'])
+    assert "one more question" in second['delta']
+    assert "[Long-term Knowledge]" not in second['delta']
+
+    # Another session has not been sent the prefix yet
+    other = orchestrator.get_context_delta('b')
+    assert not other['cached']
+    assert other['delta'] == other['text']
+
+    orchestrator.clear_all()
+    assert not orchestrator._last_emit
+
+
+def test_context_delta_sessions_are_bounded(monkeypatch):
+    """The least recently used session is evicted past the limit."""
+    monkeypatch.setattr(orchestrator_module, '_MAX_DELTA_SESSIONS', 2)
+    orchestrator = _orchestrator()
+
+    orchestrator.get_context_delta('a')
+    orchestrator.get_context_delta('b')
+    orchestrator.get_context_delta('a')
+    orchestrator.get_context_delta('c')
+
+    assert list(orchestrator._last_emit) == ['a', 'c']
+    assert orchestrator.get_context_delta('a')['cached']
+    assert not orchestrator.get_context_delta('b')['cached']
+
+
+def test_mtm_merge_is_opt_in():
+    """Repeated summaries are only merged when mtm_merge_threshold is set."""
+    def run(**kwargs):
+        orchestrator = EnhancedMemoryOrchestrator(ShortTermMemory(max_size=5), MidTermMemory(),
+                                                  LongTermMemory(), Summarizer(), **kwargs)
+        for _ in range(3):
+            for i in range(orchestrator.summarize_every):
+                orchestrator.add_message('user', f"same small talk {i}")
+        return orchestrator.mid_term_chunk_count
+
+    assert run() == 3
+    assert run(mtm_merge_threshold=0.95) == 1
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests for InputPreprocessor memoization.
+"""
+
+import gc
+import weakref
+from core.preprocessor import InputPreprocessor
+
+
+def test_preprocess_cache_is_bounded_and_reused():
+    """Repeated raw text reuses the cached embedding; the oldest entry is evicted."""
+    preprocessor = InputPreprocessor(cache_size=2)
+
+    first = preprocessor.preprocess("Where is the cache?")
+    assert preprocessor.preprocess("Where is the cache?")['embedding'] is first['embedding']
+    assert preprocessor.preprocess("Where is the cache?", with_embedding=False)['embedding'] is None
+
+    preprocessor.preprocess("one")
+    preprocessor.preprocess("two")
+    assert list(preprocessor._cache) == ["one", "two"]
+
+
+def test_preprocessor_is_freed_without_cycle_collection():
+    """The cache holds no reference back to the instance."""
+    preprocessor = InputPreprocessor()
+    preprocessor.preprocess("hello")
+    ref = weakref.ref(preprocessor)
+
+    gc.disable()
+    try:
+        del preprocessor
+        assert ref() is None
+    finally:
+        gc.enable()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Tests for ShortTermMemory message storage.
+"""
+
+from core.short_term import ShortTermMemory
+
+
+def test_add_copies_metadata():
+    """Mutating the caller's metadata after add() leaves the stored message alone."""
+    stm = ShortTermMemory()
+    metadata = {'embedding': [1.0, 0.0], 'intent': 'question'}
+
+    stm.add('user', "hello", metadata)
+    metadata['intent'] = 'changed'
+    metadata.pop('embedding')
+
+    assert stm.messages[-1]['metadata'] == {'embedding': [1.0, 0.0], 'intent': 'question'}
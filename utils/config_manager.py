@@ -10,12 +10,19 @@ Provides centralized configuration management with:
 
 import yaml
 import os
+import hashlib
 from typing import Any, Dict, Optional, List
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# libyaml-backed dumper when available
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
 
 class ConfigManager:
     """
@@ -31,6 +38,8 @@ class ConfigManager:
         """
         self.config_file = config_file
         self.config: Dict[str, Any] = {}
+        # (path, digest, mtime) of the last write, used to skip no-op saves
+        self._last_saved: Optional[tuple] = None
         self._load_config()
     
     def _load_config(self):
@@ -195,12 +204,25 @@ class ConfigManager:
         save_path = file_path or self.config_file
         
         try:
+            data = yaml.dump(self.config, Dumper=YamlDumper,
+                             default_flow_style=False, indent=2).encode('utf-8')
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            
+            # Skip the write if this exact content is already on disk untouched
+            if self._last_saved and os.path.exists(save_path):
+                last_path, last_digest, last_mtime = self._last_saved
+                if (last_path == save_path and last_digest == digest
+                        and os.path.getmtime(save_path) == last_mtime):
+                    logger.debug(f"Config unchanged, skipped saving {save_path}")
+                    return
+            
             # Create directory if needed
             os.makedirs(os.path.dirname(save_path), exist_ok=True)
             
-            with open(save_path, 'w') as f:
-                yaml.dump(self.config, f, default_flow_style=False, indent=2)
+            with open(save_path, 'wb', buffering=1 << 16) as f:
+                f.write(data)
             
+            self._last_saved = (save_path, digest, os.path.getmtime(save_path))
             logger.info(f"✅ Saved config to {save_path}")
             
         except Exception as e:
@@ -292,7 +314,7 @@ class ConfigManager:
             with open(file_path, 'w') as f:
                 f.write("# Memory Layer Lab Configuration Template\n")
                 f.write("# Generated from current settings\n\n")
-                yaml.dump(self.config, f, default_flow_style=False, indent=2)
+                yaml.dump(self.config, f, Dumper=YamlDumper, default_flow_style=False, indent=2)
             
             logger.info(f"✅ Exported template to {file_path}")
             
@@ -43,10 +43,11 @@ class FakeEmbeddingGenerator:
         
         # Use hash of text as seed for reproducibility
         seed = int(hashlib.md5(text.encode('utf-8')).hexdigest(), 16) % (2**32)
-        np.random.seed(seed)
         
-        # Generate random vector
-        embedding = np.random.randn(self.embedding_dim)
+        # Generate random vector (own legacy generator: leaves the global RNG
+        # alone but draws the same values np.random.seed + randn did, so
+        # previously cached embeddings stay valid)
+        embedding = np.random.RandomState(seed).randn(self.embedding_dim)
         
         # Normalize to unit length (good for cosine similarity)
         norm = np.linalg.norm(embedding)
@@ -2,7 +2,9 @@
 Real embedding generator using sentence-transformers.
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
+import hashlib
+import threading
 import numpy as np
 
 
@@ -97,10 +99,10 @@ class RealEmbeddingGenerator:
     
     def _simple_embedding(self, text: str) -> List[float]:
         """Simple hash-based embedding (last resort fallback)."""
-        # Hash text to generate pseudo-embedding
-        hash_val = hash(text)
-        np.random.seed(abs(hash_val) % (2**32))
-        return np.random.randn(self.embedding_dim).tolist()
+        # Hash text to seed a private generator (stable across processes,
+        # unlike hash(), and no global RNG state to contend on)
+        seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest(), 'little')
+        return np.random.default_rng(seed).standard_normal(self.embedding_dim).tolist()
     
     def similarity(self, emb1: List[float], emb2: List[float]) -> float:
         """
@@ -144,3 +146,38 @@ class RealEmbeddingGenerator:
             return embeddings.tolist()
         else:
             return [self.generate(text) for text in texts]
+
+
+# One loaded generator per model name, shared by every caller in the process
+_shared_embedders: Dict[str, RealEmbeddingGenerator] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_embedder(model_name: str = 'all-MiniLM-L6-v2') -> RealEmbeddingGenerator:
+    """
+    Get the process-wide generator for a model, loading it on first use.
+    
+    Loading a model is slow, so preprocessors and LTM backends share one
+    instance instead of constructing their own. Only a loaded
+    sentence-transformers model is shared: the TF-IDF fallback refits on
+    every text it sees, so each caller gets a private fallback instance.
+    
+    Args:
+        model_name: Name of sentence-transformers model
+        
+    Returns:
+        RealEmbeddingGenerator (shared when backed by a transformer)
+    """
+    with _shared_lock:
+        embedder = _shared_embedders.get(model_name)
+        if embedder is None:
+            embedder = RealEmbeddingGenerator(model_name)
+            if embedder.use_transformer:
+                _shared_embedders[model_name] = embedder
+        return embedder
+
+
+def shutdown() -> None:
+    """Drop the shared generators (e.g. between tests); the next call reloads."""
+    with _shared_lock:
+        _shared_embedders.clear()